@@ -12,5 +12,16 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Async views: cheap endpoints answer on the event loop, analysis runs in a thread pool
+os.environ.setdefault('ROOT_URLCONF', 'backend.urls_async')
 
 application = get_asgi_application()
+
+# Server workers only, so manage.py commands skip it: preload the persisted
+# model fits; the market snapshot and search index build on first request
+from django.conf import settings  # noqa: E402
+
+if settings.MODEL_WARM_START:
+    from core.main_model import warm_start
+
+    warm_start()
@@ -59,8 +59,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so Server-Timing and the latency histogram cover the whole stack
+    'core.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',
+    # After WhiteNoise, which serves its own precompressed static files
+    'django.middleware.gzip.GZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,7 +83,8 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
 
-ROOT_URLCONF = 'backend.urls'
+# backend/asgi.py switches this to the async routes in backend.urls_async
+ROOT_URLCONF = env('ROOT_URLCONF', default='backend.urls')
 
 TEMPLATES = [
     {
@@ -98,20 +103,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# Threads that run analyze_stock and database reads for the async (ASGI) views
+ANALYSIS_WORKERS = env.int('ANALYSIS_WORKERS', default=4)
+
+# Cache-Control for the stock and prediction API; clients revalidate with ETag after max-age
+API_CACHE_MAX_AGE = env.int('API_CACHE_MAX_AGE', default=5)
+API_CACHE_STALE_WHILE_REVALIDATE = env.int('API_CACHE_STALE_WHILE_REVALIDATE', default=30)
+
+# Load persisted model artifacts (core/.pricestore/models) into each server worker at startup
+# (backend/asgi.py, backend/wsgi.py; build them in the release step)
+MODEL_WARM_START = env.bool('MODEL_WARM_START', default=True)
+
+# Allow ?profile=1 on any view to return a cProfile report instead of the response
+API_PROFILING = env.bool('API_PROFILING', default=DEBUG)
+
+# core.main_model reports fits and data problems through the 'core' logger
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': env('CORE_LOG_LEVEL', default='INFO')},
+    },
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': env("DB_NAME"),
-        'USER': env("DB_USER"),
-        'PASSWORD': env("DB_PASSWORD"),
-        'HOST': env("DB_HOST"),
-        'PORT': env("DB_PORT"),
+# DATABASE_URL (e.g. sqlite:////tmp/devstock.sqlite3) points at a local stand-in for
+# offline ingest benchmarks; otherwise the PostgreSQL settings below are used.
+if env('DATABASE_URL', default=None):
+    DATABASES = {'default': env.db('DATABASE_URL')}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env("DB_NAME"),
+            'USER': env("DB_USER"),
+            'PASSWORD': env("DB_PASSWORD"),
+            'HOST': env("DB_HOST"),
+            'PORT': env("DB_PORT"),
+        }
     }
-}
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
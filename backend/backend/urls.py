@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path
-from core.views import StockView, StocksListView, StockDetailView, PredictionsListView, PredictionDetailView, NewsListView, NewsDetailView, MarketIndicesView, MarketStatusView, MarketMoversView
+from core.views import StockView, StocksListView, StockDetailView, PredictionsListView, PredictionDetailView, NewsListView, NewsDetailView, MarketIndicesView, MarketStatusView, MarketMoversView, MarketScreenerView, MarketQuotesView, CacheStatsView, MetricsView, BatchPredictionView, BacktestView
 from django.contrib import admin
 from django.conf.urls.static import static
 from django.conf import settings
@@ -27,14 +27,17 @@ urlpatterns = [
     
     # Stocks endpoints
     path('api/stocks/', StocksListView.as_view(), name='stocks-list'),
+    # Before the <symbol> routes, which would otherwise take 'search' as a symbol
+    path('api/stocks/search/', StocksListView.as_view(), name='stocks-search'),
     path('api/stocks/<str:symbol>/', StockDetailView.as_view(), name='stock-detail'),
     path('api/stocks/<str:symbol>/history/', StockDetailView.as_view(), name='stock-history'),
-    path('api/stocks/search/', StocksListView.as_view(), name='stocks-search'),
+    path('api/stocks/<str:symbol>/backtest/', BacktestView.as_view(), name='stock-backtest'),
     
     # Predictions endpoints
     path('api/predictions/', PredictionsListView.as_view(), name='predictions-list'),
-    path('api/predictions/<str:symbol>/', PredictionDetailView.as_view(), name='prediction-detail'),
+    path('api/predictions/batch/', BatchPredictionView.as_view(), name='predictions-batch'),
     path('api/predictions/top/', PredictionsListView.as_view(), name='predictions-top'),
+    path('api/predictions/<str:symbol>/', PredictionDetailView.as_view(), name='prediction-detail'),
     
     # News endpoints
     path('api/news/', NewsListView.as_view(), name='news-list'),
@@ -44,5 +47,11 @@ urlpatterns = [
     path('api/market/indices/', MarketIndicesView.as_view(), name='market-indices'),
     path('api/market/status/', MarketStatusView.as_view(), name='market-status'),
     path('api/market/movers/', MarketMoversView.as_view(), name='market-movers'),
+    path('api/market/screener/', MarketScreenerView.as_view(), name='market-screener'),
+    path('api/market/quotes/', MarketQuotesView.as_view(), name='market-quotes'),
+
+    # Diagnostics
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
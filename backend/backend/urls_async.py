@@ -0,0 +1,15 @@
+"""
+URL configuration for the ASGI entry point (backend/asgi.py).
+
+Same routes as backend.urls, with each core API view swapped for its async
+version from core.async_views.
+"""
+from django.urls import URLPattern
+from backend.urls import urlpatterns as sync_urlpatterns
+from core.async_views import async_view
+
+urlpatterns = [
+    URLPattern(pattern.pattern, async_view(pattern.callback.view_class), pattern.default_args, pattern.name)
+    if isinstance(pattern, URLPattern) and hasattr(pattern.callback, 'view_class') else pattern
+    for pattern in sync_urlpatterns
+]
@@ -15,3 +15,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 
 application = get_wsgi_application()
+
+# Server workers only, so manage.py commands skip it: preload the persisted
+# model fits; the market snapshot and search index build on first request
+from django.conf import settings  # noqa: E402
+
+if settings.MODEL_WARM_START:
+    from core.main_model import warm_start
+
+    warm_start()
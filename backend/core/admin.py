@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Stock
+from .models import Prediction, Stock
 
 admin.site.register(Stock)
+admin.site.register(Prediction)
@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.permissions import AllowAny
+
+from .instrumentation import span
+
+from .views import (
+    BacktestView,
+    BatchPredictionView,
+    MarketIndicesView,
+    MarketMoversView,
+    MarketQuotesView,
+    MarketScreenerView,
+    PredictionDetailView,
+    PredictionsListView,
+    StockDetailView,
+    StockView,
+    StocksListView,
+)
+
+# Views that run analyze_stock, hit the database or may (re)build the market
+# snapshot from the price files; everything else is answered straight from
+# the event loop
+OFFLOADED_VIEWS = (
+    StockView, StockDetailView, BacktestView, PredictionsListView, PredictionDetailView, BatchPredictionView,
+    StocksListView, MarketIndicesView, MarketMoversView, MarketScreenerView, MarketQuotesView,
+)
+
+# Request headers that change the rendered response, so they are part of the single-flight key
+VARY_HEADERS = ('HTTP_ACCEPT', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+_executor = None
+
+
+def in_context(fn, *args):
+    """
+    fn(*args) bound to the caller's contextvars, so spans recorded on an
+    executor thread land in the request that started the work.
+    """
+    return functools.partial(contextvars.copy_context().run, fn, *args)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.ANALYSIS_WORKERS, thread_name_prefix='analysis')
+    return _executor
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls: the first caller for a key starts the
+    work on the executor, later callers await the same future.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    async def run(self, key, fn, *args):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(get_executor(), in_context(fn, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # shield: one client disconnecting must not cancel the others' result
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+
+single_flight = SingleFlight()
+
+
+def _render(view, request, kwargs):
+    """
+    Run a DRF view and return its rendered (status, headers, content), which,
+    unlike the response object, can be handed to several coalesced requests.
+    """
+    response = view(request, **kwargs)
+    if hasattr(response, 'render'):
+        with span('render'):
+            response.render()
+    return response.status_code, list(response.items()), response.content
+
+
+def _render_offloaded(view, request, kwargs):
+    try:
+        return _render(view, request, kwargs)
+    finally:
+        # Executor threads outlive requests; don't let their connections go stale
+        close_old_connections()
+
+
+def _to_response(rendered):
+    status, headers, content = rendered
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def async_view(view_class):
+    """
+    Async version of a core APIView. The API is public, so authentication is
+    skipped: DRF's session lookup would otherwise touch the database on the loop.
+    """
+    view = type(view_class.__name__, (view_class,), {
+        'authentication_classes': [],
+        'permission_classes': [AllowAny],
+    }).as_view()
+
+    if issubclass(view_class, OFFLOADED_VIEWS):
+        async def handler(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                key = (
+                    view_class.__name__,
+                    request.method,
+                    request.get_full_path(),
+                    tuple(request.META.get(header) for header in VARY_HEADERS),
+                )
+                rendered = await single_flight.run(key, _render_offloaded, view, request, kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                rendered = await loop.run_in_executor(get_executor(), in_context(_render_offloaded, view, request, kwargs))
+            return _to_response(rendered)
+    else:
+        async def handler(request, *args, **kwargs):
+            return _to_response(_render(view, request, kwargs))
+
+    handler.view_class = view_class
+    handler.csrf_exempt = True
+    return handler
@@ -0,0 +1,130 @@
+import numpy as np
+
+from .main_model import build_features, features_list
+from .regression import solve_normal_equations
+
+MODES = ('expanding', 'sliding')
+
+# Bars in the first training window (and the sliding window length) unless given: one trading year
+DEFAULT_MIN_TRAIN = 252
+
+
+def cumulative_stats(X, y):
+    """
+    Running sums of rows, targets, X'X and X'y (each with a leading zero row),
+    so the statistics of any row range [a, b) are S[b] - S[a].
+    Rows are centred on the column means first to keep the differences accurate.
+    """
+    shift_x = X.mean(axis=0)
+    shift_y = y.mean()
+    Xs = X - shift_x
+    ys = (y - shift_y)[:, None]
+
+    def running(values):
+        out = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    return {
+        'shift_x': shift_x,
+        'shift_y': shift_y,
+        'sum_x': running(Xs),
+        'sum_y': running(ys),
+        'xtx': running(Xs[:, :, None] * Xs[:, None, :]),
+        'xty': running(Xs[:, :, None] * ys[:, None, :]),
+    }
+
+
+def walk_forward(X, y, min_train=DEFAULT_MIN_TRAIN, step=1, mode='expanding', window=None):
+    """
+    Refit OLS every `step` rows and predict the next `step` rows out of sample.
+
+    Training covers rows [0, t) ('expanding') or the last `window` rows before t
+    ('sliding'). Every window's fit comes from differences of cumulative sums
+    and all fits share one batched solve, so a daily walk over 10k rows is a
+    few vectorised passes rather than 10k regressions.
+    Returns (starts, ends, train_rows, coef (w, p), intercept (w,), predictions
+    for rows [min_train, n)).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+    n = len(X)
+    window = min_train if window is None else window
+    if step < 1 or min_train < 2 or window < 2:
+        raise ValueError('step must be >= 1 and min_train / window >= 2')
+    if n <= min_train:
+        raise ValueError(f'Need more than {min_train} rows for a walk-forward test, got {n}')
+
+    starts = np.arange(min_train, n, step)
+    ends = np.minimum(starts + step, n)
+    train_from = np.zeros_like(starts) if mode == 'expanding' else np.maximum(starts - window, 0)
+
+    stats = cumulative_stats(X, y)
+    between = lambda s: s[starts] - s[train_from]
+    coef, intercept = solve_normal_equations(
+        starts - train_from,
+        between(stats['sum_x']),
+        between(stats['sum_y']),
+        between(stats['xtx']),
+        between(stats['xty']),
+    )
+    coef = coef[..., 0]
+    intercept = intercept[:, 0] + stats['shift_y'] - coef @ stats['shift_x']
+
+    # Each test row is predicted by the fit of the window it falls in
+    rows = np.arange(min_train, n)
+    owner = (rows - min_train) // step
+    predicted = np.einsum('ip,ip->i', X[rows], coef[owner]) + intercept[owner]
+    return starts, ends, starts - train_from, coef, intercept, predicted
+
+
+def window_metrics(y_true, y_pred, bounds):
+    """
+    RMSE, MAPE and R^2 of each contiguous block starting at the offsets in
+    `bounds`, with regression_metrics' conventions.
+    """
+    counts = np.diff(np.append(bounds, len(y_true)))
+    residual = y_true - y_pred
+    ss_res = np.add.reduceat(residual ** 2, bounds)
+    rmse = np.sqrt(ss_res / counts)
+    mape = np.add.reduceat(np.abs(residual) / np.maximum(np.abs(y_true), np.finfo(np.float64).eps), bounds) / counts
+    mean = np.add.reduceat(y_true, bounds) / counts
+    ss_tot = np.add.reduceat((y_true - np.repeat(mean, counts)) ** 2, bounds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+    return rmse, mape, r2
+
+
+def backtest_stock(prices, mode='expanding', step=1, window=None, min_train=DEFAULT_MIN_TRAIN):
+    """
+    Walk-forward backtest of analyze_stock's model on date-sorted price columns.
+    Returns per-window and overall out-of-sample metrics plus the prediction
+    series; raises ValueError for bad parameters or too little data.
+    """
+    window = min_train if window is None else window
+    df = build_features(prices)
+    X = df[features_list].to_numpy(dtype=np.float64)
+    y = df['Target'].to_numpy(dtype=np.float64)
+    starts, ends, train_rows, _, _, predicted = walk_forward(X, y, min_train, step, mode, window)
+
+    actual = y[min_train:]
+    rmse, mape, r2 = window_metrics(actual, predicted, starts - min_train)
+    overall = window_metrics(actual, predicted, np.array([0]))
+    dates = df.index.strftime('%Y-%m-%d').to_numpy()
+    return {
+        'mode': mode,
+        'step': step,
+        'window': window if mode == 'sliding' else None,
+        'min_train': min_train,
+        'refits': len(starts),
+        'rmse': float(overall[0][0]),
+        'mape': float(overall[1][0]),
+        'r2': float(overall[2][0]),
+        'windows': [
+            {'start': dates[s], 'end': dates[e - 1], 'train_rows': int(t), 'rmse': float(a), 'mape': float(b), 'r2': float(c)}
+            for s, e, t, a, b, c in zip(starts, ends, train_rows, rmse, mape, r2)
+        ],
+        'dates': dates[min_train:].tolist(),
+        'actual_prices': actual.tolist(),
+        'predicted_prices': predicted.tolist(),
+    }
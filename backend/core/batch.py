@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+
+from .main_model import FEATURE_PLAN, FEATURE_SPECS, features_list, script_dir, split_percentage
+from .price_store import load_prices
+from .regression import solve_normal_equations
+from .tickers import is_valid_symbol, ticker_file
+
+# Tickers stacked into one (K, T, p) block; bounds memory for very long symbol lists
+BATCH_CHUNK = 64
+MAX_SYMBOLS = 500
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def stack_prices(price_list):
+    """
+    Right-pad each ticker's columns with NaN into (K, T) arrays.
+    Returns (columns, dates, lengths).
+    """
+    lengths = np.array([len(p['date']) for p in price_list], dtype=np.int64)
+    shape = (len(price_list), int(lengths.max()))
+    columns = {name: np.full(shape, np.nan) for name in PRICE_COLUMNS}
+    dates = np.zeros(shape, dtype=np.int64)
+    for k, prices in enumerate(price_list):
+        n = lengths[k]
+        dates[k, :n] = prices['date']
+        for name in PRICE_COLUMNS:
+            columns[name][k, :n] = prices[name]
+    return columns, dates, lengths
+
+
+def stacked_features(columns):
+    """
+    analyze_stock's feature matrix for every ticker at once: X is (K, T, p)
+    in features_list order, target (K, T) is the next day's close.
+    """
+    features = FEATURE_PLAN.execute(columns)
+    X = np.stack([features[FEATURE_SPECS[name]] for name in features_list], axis=-1)
+    close = columns['close']
+    target = np.full(close.shape, np.nan)
+    target[:, :-1] = close[:, 1:]
+    return X, target
+
+
+def fit_batch(X, target):
+    """
+    Chronological 80/20 split and OLS fit for every ticker with one batched
+    X'X product and one batched eigensolve.
+    Returns a dict of per-ticker arrays (coef, intercept, masks, predictions, metrics).
+    """
+    finite = np.isfinite(X).all(axis=-1)
+    valid = finite & np.isfinite(target)
+    split = (valid.sum(axis=1) * split_percentage).astype(np.int64)
+    rank = np.cumsum(valid, axis=1) - 1
+    train = valid & (rank < split[:, None])
+    test = valid & (rank >= split[:, None])
+    n_train = train.sum(axis=1)
+    n_test = test.sum(axis=1)
+
+    # Centre on each ticker's training mean before forming X'X
+    n_safe = np.maximum(n_train, 1)
+    X0 = np.where(finite[..., None], X, 0.0)
+    y0 = np.where(valid, target, 0.0)
+    shift_x = (X0 * train[..., None]).sum(axis=1) / n_safe[:, None]
+    shift_y = (y0 * train).sum(axis=1) / n_safe
+    Xs = np.where(train[..., None], X0 - shift_x[:, None, :], 0.0)
+    ys = np.where(train, y0 - shift_y[:, None], 0.0)
+
+    Xs_t = np.swapaxes(Xs, 1, 2)
+    coef, intercept = solve_normal_equations(
+        n_safe, Xs.sum(axis=1), ys.sum(axis=1)[:, None], Xs_t @ Xs, Xs_t @ ys[..., None],
+    )
+    coef = coef[..., 0]
+    intercept = intercept[:, 0] + shift_y - np.einsum('kp,kp->k', shift_x, coef)
+    predicted = np.einsum('ktp,kp->kt', X0, coef) + intercept[:, None]
+
+    # Test-set metrics, computed as regression_metrics does but masked per ticker
+    m = np.maximum(n_test, 1)
+    residual = np.where(test, y0 - predicted, 0.0)
+    rmse = np.sqrt((residual ** 2).sum(axis=1) / m)
+    mape = (np.abs(residual) / np.maximum(np.abs(y0), np.finfo(np.float64).eps)).sum(axis=1) / m
+    y_mean = (y0 * test).sum(axis=1) / m
+    ss_tot = np.where(test, (y0 - y_mean[:, None]) ** 2, 0.0).sum(axis=1)
+    ss_res = (residual ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+
+    return {
+        'coef': coef,
+        'intercept': intercept,
+        'finite': finite,
+        'test': test,
+        'n_train': n_train,
+        'n_test': n_test,
+        'predicted': predicted,
+        'rmse': rmse,
+        'mape': mape,
+        'r2': r2,
+    }
+
+
+def batch_predict(symbols, include_series=False):
+    """
+    Fit and evaluate analyze_stock's model for many symbols in stacked passes.
+    Returns (results, errors): one result dict per usable symbol, in request
+    order, and {symbol: message} for the rest.
+    """
+    results, errors = {}, {}
+    loaded = []
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        if not is_valid_symbol(symbol):
+            errors[symbol] = 'Invalid symbol'
+            continue
+        filename, company = ticker_file(symbol)
+        try:
+            prices = load_prices(os.path.join(script_dir, filename))
+        except FileNotFoundError:
+            errors[symbol] = 'Unknown symbol'
+            continue
+        except (ValueError, KeyError) as e:
+            # A malformed price file only fails its own symbol
+            errors[symbol] = f'Could not read price data: {e}'
+            continue
+        if len(prices['date']) == 0:
+            errors[symbol] = 'No price data'
+            continue
+        loaded.append((symbol, company, prices))
+
+    for start in range(0, len(loaded), BATCH_CHUNK):
+        chunk = loaded[start:start + BATCH_CHUNK]
+        columns, dates, lengths = stack_prices([prices for _, _, prices in chunk])
+        X, target = stacked_features(columns)
+        fit = fit_batch(X, target)
+
+        for k, (symbol, company, _) in enumerate(chunk):
+            if fit['n_train'][k] == 0 or fit['n_test'][k] == 0:
+                errors[symbol] = 'Not enough data to create a test set'
+                continue
+            last = lengths[k] - 1
+            result = {
+                'symbol': symbol,
+                'company': company,
+                'as_of': str(dates[k, last].astype('datetime64[ns]').astype('datetime64[D]')),
+                'last_price': float(columns['close'][k, last]),
+                'next_price': float(fit['predicted'][k, last]) if fit['finite'][k, last] else None,
+                'rmse': float(fit['rmse'][k]),
+                'mape': float(fit['mape'][k]),
+                'r2': float(fit['r2'][k]),
+                'train_rows': int(fit['n_train'][k]),
+                'test_rows': int(fit['n_test'][k]),
+            }
+            if include_series:
+                rows = fit['test'][k]
+                result['dates'] = np.datetime_as_string(dates[k, rows].astype('datetime64[ns]'), unit='D').tolist()
+                result['actual_prices'] = target[k, rows].tolist()
+                result['predicted_prices'] = fit['predicted'][k, rows].tolist()
+            results[symbol] = result
+
+    order = [symbol for symbol, _, _ in loaded]
+    return [results[s] for s in order if s in results], errors
@@ -0,0 +1,495 @@
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .backtest import DEFAULT_MIN_TRAIN, MODES as BACKTEST_MODES, backtest_stock, walk_forward
+from .features import FeaturePlan
+from .instrumentation import request_spans, span
+from .main_model import (
+    FEATURE_SPECS, build_features, feature_matrix, features_list, fit_stock_model, script_dir, split_percentage,
+)
+from .price_store import load_prices
+from .regression import IncrementalOLS
+from .tickers import TICKERS
+
+
+def best_time(fn, repeat=5):
+    """
+    Best wall time of `repeat` calls, in seconds, and the last result.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(fn):
+    """
+    Peak Python/numpy heap allocated while fn() runs, in bytes (tracemalloc).
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stage_times(fn):
+    """
+    Run fn() collecting its core.instrumentation spans, as a request would.
+    Returns ({stage: seconds}, result).
+    """
+    token = request_spans.set([])
+    try:
+        result = fn()
+        spans = request_spans.get()
+    finally:
+        request_spans.reset(token)
+    times = {}
+    for name, seconds in spans:
+        times[name] = times.get(name, 0.0) + seconds
+    return times, result
+
+
+def synthetic_prices(rows, seed=0):
+    """
+    Reproducible random-walk OHLCV bars in the load_prices layout, one minute
+    apart (daily bars would run past datetime64[ns] at a few million rows).
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+    open_ = close * np.exp(rng.normal(0, 0.0005, rows))
+    spread = 1 + np.abs(rng.normal(0, 0.001, rows))
+    start = np.datetime64('2000-01-03T09:30', 'ns').astype(np.int64)
+    return {
+        'date': start + np.arange(rows, dtype=np.int64) * 60_000_000_000,
+        'open': open_,
+        'high': np.maximum(open_, close) * spread,
+        'low': np.minimum(open_, close) / spread,
+        'close': close,
+        'volume': rng.lognormal(13, 0.5, rows).astype(np.int64),
+    }
+
+
+def training_data(filename):
+    df = build_features(load_prices(os.path.join(script_dir, filename)))
+    X = df[features_list].to_numpy()
+    y = df['Target'].to_numpy()
+    return X, y, int(len(df) * split_percentage)
+
+
+def bench_regression(repeat=5):
+    """
+    IncrementalOLS against sklearn's LinearRegression on every bundled ticker:
+    full fit, appending one bar, and sliding the training window by one bar.
+    sklearn is run with the classic lstsq cutoff (eps * max(n, p)); its 1.7+
+    default tol=1e-6 drops the price directions because Volume is unscaled.
+    """
+    from sklearn.linear_model import LinearRegression
+
+    results = []
+    for symbol, (filename, _) in TICKERS.items():
+        X, y, split = training_data(filename)
+        X_train, y_train, X_next, y_next = X[:split], y[:split], X[split:split + 1], y[split:split + 1]
+        tol = np.finfo(np.float64).eps * max(X_train.shape)
+
+        sklearn_fit, reference = best_time(lambda: LinearRegression(tol=tol).fit(X_train, y_train), repeat)
+        ols_fit, model = best_time(lambda: IncrementalOLS().fit(X_train, y_train), repeat)
+        sklearn_append, _ = best_time(lambda: LinearRegression(tol=tol).fit(X[:split + 1], y[:split + 1]), repeat)
+
+        def append_bar():
+            model.partial_fit(X_next, y_next)
+            return model.remove(X_next, y_next)
+
+        def slide_bar():
+            model.partial_fit(X_next, y_next)
+            model.remove(X_train[:1], y_train[:1])
+            model.partial_fit(X_train[:1], y_train[:1])
+            return model.remove(X_next, y_next)
+
+        ols_append, _ = best_time(append_bar, repeat)
+        ols_slide, _ = best_time(slide_bar, repeat)
+
+        X_test = X[split:]
+        results.append({
+            'symbol': symbol,
+            'rows': split,
+            'sklearn_fit_ms': sklearn_fit * 1000,
+            'ols_fit_ms': ols_fit * 1000,
+            'sklearn_refit_ms': sklearn_append * 1000,
+            # append_bar adds and removes a bar, slide_bar slides forward and back
+            'ols_append_ms': ols_append * 1000 / 2,
+            'ols_slide_ms': ols_slide * 1000 / 2,
+            'coef_rel_diff': float(np.abs(model.coef_ - reference.coef_).max() / np.abs(reference.coef_).max()),
+            'pred_abs_diff': float(np.abs(model.predict(X_test) - reference.predict(X_test)).max()),
+        })
+    return results
+
+
+def bench_serialization(repeat=5):
+    """
+    Size and render time of each ticker's analyze_stock payload in the plain
+    JSON, compact JSON and packed binary encodings, raw and gzipped.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .renderers import CompactJSONRenderer, PackedRenderer
+
+    renderers = {'json': JSONRenderer(), 'compact': CompactJSONRenderer(), 'packed': PackedRenderer()}
+    results = []
+    for symbol, (filename, company_name) in TICKERS.items():
+        _, payload = fit_stock_model(load_prices(os.path.join(script_dir, filename)), company_name, verbose=False)
+        for name, renderer in renderers.items():
+            render, body = best_time(lambda: renderer.render(payload), repeat)
+            compress, zipped = best_time(lambda: gzip.compress(body, compresslevel=6), repeat)
+            results.append({
+                'symbol': symbol,
+                'format': name,
+                'points': len(payload['dates']),
+                'bytes': len(body),
+                'gzip_bytes': len(zipped),
+                'render_ms': render * 1000,
+                'gzip_ms': compress * 1000,
+            })
+    return results
+
+
+def bench_backtest(repeat=5):
+    """
+    Daily walk-forward backtests (one refit per bar after a one-year warm-up)
+    on every bundled ticker: the batched refits alone and the full
+    backtest_stock call including features and the per-window report.
+    """
+    results = []
+    for symbol, (filename, _) in TICKERS.items():
+        prices = load_prices(os.path.join(script_dir, filename))
+        df = build_features(prices)
+        X = df[features_list].to_numpy()
+        y = df['Target'].to_numpy()
+        for mode in BACKTEST_MODES:
+            refit, _ = best_time(lambda: walk_forward(X, y, DEFAULT_MIN_TRAIN, 1, mode), repeat)
+            total, report = best_time(lambda: backtest_stock(prices, mode=mode), repeat)
+            results.append({
+                'symbol': symbol,
+                'mode': mode,
+                'rows': len(X),
+                'refits': report['refits'],
+                'refits_ms': refit * 1000,
+                'backtest_ms': total * 1000,
+                'rmse': report['rmse'],
+                'mape': report['mape'],
+            })
+    return results
+
+
+# Synthetic series lengths for the pipeline benchmark (up to 10_000_000 via --rows)
+PIPELINE_ROWS = (1_000, 100_000, 1_000_000)
+
+# fit_stock_model spans, in pipeline order, plus rendering the payload as the API does
+PIPELINE_STAGES = ('features', 'fit', 'metrics', 'serialize', 'render')
+
+
+def bench_pipeline(repeat=5, sizes=PIPELINE_ROWS, tickers=1):
+    """
+    fit_stock_model and JSON rendering on synthetic series of each size, for
+    `tickers` independent series per size: the best time of each stage
+    (averaged over the series), their sum per series, and the peak heap of
+    one traced run (the largest across the series).
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+    results = []
+    for rows in sizes:
+        best = dict.fromkeys(PIPELINE_STAGES, 0.0)
+        peak = 0
+        for seed in range(tickers):
+            prices = synthetic_prices(rows, seed)
+
+            def run():
+                _, payload = fit_stock_model(prices, f'SYN{seed}', verbose=False)
+                with span('render'):
+                    renderer.render(payload)
+
+            runs = [stage_times(run)[0] for _ in range(repeat)]
+            for stage in PIPELINE_STAGES:
+                best[stage] += min(times[stage] for times in runs) / tickers
+            peak = max(peak, peak_memory(run))
+        results.append({
+            'rows': rows,
+            'tickers': tickers,
+            **{f'{stage}_ms': seconds * 1000 for stage, seconds in best.items()},
+            'total_ms': sum(best.values()) * 1000,
+            'peak_mb': peak / 2**20,
+        })
+    return results
+
+
+def dataframe_matrix(prices):
+    """
+    The feature matrix as fit_stock_model used to build it: a DataFrame,
+    dropna() and a column selection, then a float64 array for the solver.
+    """
+    df = build_features(prices)
+    return df.index, df[features_list].to_numpy(dtype=np.float64), df['Target'].to_numpy()
+
+
+# Feature matrix builders compared by the layout benchmark
+LAYOUTS = {
+    'dataframe': dataframe_matrix,
+    'matrix float64': lambda prices: feature_matrix(prices, np.float64),
+    'matrix float32': lambda prices: feature_matrix(prices, np.float32),
+}
+
+
+def bench_layout(repeat=5, sizes=PIPELINE_ROWS):
+    """
+    Memory report of the feature matrix: the DataFrame path against
+    feature_matrix in float64 and float32 on synthetic series of each size.
+    Times building the matrix and fitting on it, the matrix's own size, and
+    the peak heap of building (and of building then fitting) it.
+    """
+    results = []
+    for rows in sizes:
+        prices = synthetic_prices(rows)
+        for layout, build in LAYOUTS.items():
+            def build_and_fit():
+                _, X, y = build(prices)
+                return IncrementalOLS().fit(X, y)
+
+            build_seconds, (_, X, y) = best_time(lambda: build(prices), repeat)
+            fit_seconds, _ = best_time(lambda: IncrementalOLS().fit(X, y), repeat)
+            results.append({
+                'rows': rows,
+                'layout': layout,
+                'build_ms': build_seconds * 1000,
+                'fit_ms': fit_seconds * 1000,
+                'matrix_mb': X.nbytes / 2**20,
+                'build_peak_mb': peak_memory(lambda: build(prices)) / 2**20,
+                'fit_peak_mb': peak_memory(build_and_fit) / 2**20,
+            })
+            del X, y
+    return results
+
+
+# Offline endpoints (bundled files, no database) timed through the test client
+ENDPOINTS = (
+    ('GET', '/api/stock/?choice=6', None),
+    ('GET', '/api/stocks/', None),
+    ('GET', '/api/stocks/AAPL/', None),
+    ('GET', '/api/stocks/AAPL/?format=packed', None),
+    ('GET', '/api/stocks/AAPL/history/?range=5y', None),
+    ('GET', '/api/stocks/AAPL/backtest/', None),
+    ('POST', '/api/predictions/batch/', {'symbols': list(TICKERS)}),
+)
+
+
+def bench_endpoints(repeat=5):
+    """
+    End-to-end latency of ENDPOINTS through Django's test client and the full
+    middleware stack: one cold request after clearing the model cache, then
+    4 * repeat warm requests (median and p95), and the peak heap of a cold request.
+    """
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from .model_cache import model_cache
+
+    client = Client()
+    results = []
+    logger = logging.getLogger('core')
+    level = logger.level
+    # The per-fit model report would otherwise be timed (and printed) with every cold request
+    logger.setLevel(logging.WARNING)
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for method, url, data in ENDPOINTS:
+                def request():
+                    if method == 'POST':
+                        response = client.post(url, data, content_type='application/json')
+                    else:
+                        response = client.get(url)
+                    if response.status_code != 200:
+                        raise RuntimeError(f'{method} {url} returned {response.status_code}')
+                    return response
+
+                model_cache.clear()
+                cold, response = best_time(request, 1)
+                model_cache.clear()
+                peak = peak_memory(request)
+                warm = sorted(best_time(request, 1)[0] for _ in range(4 * repeat))
+                results.append({
+                    'endpoint': f'{method} {url}',
+                    'bytes': len(response.content),
+                    'cold_ms': cold * 1000,
+                    'p50_ms': warm[len(warm) // 2] * 1000,
+                    'p95_ms': warm[min(len(warm) - 1, int(len(warm) * 0.95))] * 1000,
+                    'peak_mb': peak / 2**20,
+                })
+    finally:
+        logger.setLevel(level)
+    return results
+
+
+# 30 indicators for the feature benchmark: six windows of each rolling kind
+INDICATORS = [f'{kind}_{window}' for kind in ('sma', 'std', 'ema', 'bb_upper', 'bb_lower') for window in (5, 10, 20, 50, 100, 200)]
+
+
+def bench_features(repeat=5):
+    """
+    FeaturePlan on AAPL for one SMA, the model's feature set and 30 rolling
+    indicators, against the same indicators as separate pandas rolling passes.
+    """
+    import pandas as pd
+
+    prices = load_prices(os.path.join(script_dir, TICKERS['AAPL'][0]))
+    close = pd.Series(prices['close'])
+
+    def pandas_indicators():
+        out = {}
+        for window in (5, 10, 20, 50, 100, 200):
+            mean = close.rolling(window).mean()
+            std = close.rolling(window).std()
+            out.update({
+                f'sma_{window}': mean,
+                f'std_{window}': std,
+                f'ema_{window}': close.ewm(span=window, adjust=False).mean(),
+                f'bb_upper_{window}': mean + 2 * std,
+                f'bb_lower_{window}': mean - 2 * std,
+            })
+        return out
+
+    results = []
+    for label, names in (('sma_7', ['sma_7']), ('model', list(FEATURE_SPECS.values())), ('30 indicators', INDICATORS)):
+        plan = FeaturePlan(names)
+        seconds, _ = best_time(lambda: plan.execute(prices), repeat)
+        results.append({'features': label, 'count': len(names), 'steps': len(plan.steps), 'plan_ms': seconds * 1000})
+    seconds, _ = best_time(pandas_indicators, repeat)
+    results.append({'features': '30 indicators (pandas)', 'count': len(INDICATORS), 'steps': '-', 'plan_ms': seconds * 1000})
+    return results
+
+
+# Cold start of a web worker: modules it must not import, and its import-time budget
+HEAVY_MODULES = ('pandas', 'matplotlib', 'sklearn', 'scipy')
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 1000))
+
+# Import the app server entry point and the URLconf it routes through, as a worker's first request does
+STARTUP_CODE = (
+    'import importlib, time; start = time.perf_counter(); '
+    'module = importlib.import_module({entry!r}); from django.conf import settings; '
+    'importlib.import_module(settings.ROOT_URLCONF); print(time.perf_counter() - start)'
+)
+
+
+def import_profile(code):
+    """
+    Run code in a fresh interpreter under `python -X importtime`.
+    Returns (wall seconds printed by code, {module: cumulative import seconds}).
+    """
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.setdefault(name.strip(), int(cumulative) / 1e6)
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def bench_imports(repeat=5):
+    """
+    Cold-start import time of the WSGI and ASGI entry points, each in fresh
+    interpreters (best of `repeat`), with the heavy numerical modules they
+    pulled in. Rows over STARTUP_BUDGET_MS or importing HEAVY_MODULES are
+    marked 'over', which fails the benchmark command.
+    """
+    results = []
+    for entry in ('backend.wsgi', 'backend.asgi'):
+        runs = [import_profile(STARTUP_CODE.format(entry=entry)) for _ in range(repeat)]
+        wall, modules = min(runs, key=lambda run: run[0])
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+        results.append({
+            'entry': entry,
+            'startup_ms': wall * 1000,
+            'django_ms': modules.get('django.core.handlers.base', 0) * 1000,
+            'numpy_ms': modules.get('numpy', 0) * 1000,
+            'core_views_ms': modules.get('core.views', 0) * 1000,
+            'heavy_imports': ', '.join(heavy) or '-',
+            'budget_ms': STARTUP_BUDGET_MS,
+            'status': 'over' if heavy or wall * 1000 > STARTUP_BUDGET_MS else 'ok',
+        })
+    return results
+
+
+# Stored results of earlier runs, compared against with `benchmark --compare`;
+# tracked in git next to this module, unlike the generated price store
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Columns compared against the baseline (lower is better), and the smallest
+# absolute change in them that counts, so timer noise on sub-0.1 ms steps doesn't
+BASELINE_METRICS = {'_ms': 0.1, '_mb': 1.0}
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(suites, path=BASELINE_PATH):
+    """
+    Store {suite: rows}, replacing only the suites given.
+    """
+    baseline = {**load_baseline(path), **suites}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(baseline, f, indent=1)
+    os.replace(tmp, path)
+
+
+def compare_to_baseline(rows, baseline_rows, key, threshold):
+    """
+    Add 'vs_baseline' (the worst ratio of a metric column to its baseline
+    value) and 'status' to each row: 'over' when a metric grew by more than
+    `threshold` (a fraction) and its noise floor, 'new' without a baseline
+    row, else 'ok'. Rows are matched on the `key` columns.
+    """
+    baseline = {tuple(row.get(k) for k in key): row for row in baseline_rows}
+    compared = []
+    for row in rows:
+        before = baseline.get(tuple(row.get(k) for k in key))
+        status = row.get('status', 'ok')
+        worst = None
+        if before is None:
+            status = 'new' if status == 'ok' else status
+        else:
+            for column, value in row.items():
+                floor = next((f for suffix, f in BASELINE_METRICS.items() if column.endswith(suffix)), None)
+                old = before.get(column)
+                if floor is None or not isinstance(old, (int, float)) or old <= 0:
+                    continue
+                ratio = value / old
+                worst = ratio if worst is None else max(worst, ratio)
+                if ratio > 1 + threshold and value - old > floor:
+                    status = 'over'
+        compared.append({**{k: v for k, v in row.items() if k != 'status'},
+                         'vs_baseline': '-' if worst is None else f'{worst:.2f}x', 'status': status})
+    return compared
@@ -0,0 +1,370 @@
+import numpy as np
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Bollinger band half-width, in rolling standard deviations
+BOLLINGER_K = 2.0
+
+# Kinds whose value depends on every earlier bar (recursive filters)
+RECURSIVE_KINDS = ('@ffill', 'ema', 'rsi')
+
+# kind -> (needs(column, window) -> [step names], compute(values, column, window) -> array)
+FEATURES = {}
+
+
+def feature(kind, needs=lambda column, window: [column]):
+    """
+    Register a feature kind. Features are named '<kind>_<window>' (on close)
+    or '<kind>_<column>_<window>', e.g. 'sma_7', 'ema_volume_20'; a few take
+    neither ('range'). Kinds starting with '@' are shared per-column
+    intermediates ('@missing:close') that features list in `needs`.
+    """
+    def register(compute):
+        FEATURES[kind] = (needs, compute)
+        return compute
+    return register
+
+
+def parse_step(name):
+    """
+    Split a step name into (kind, column, window).
+    Raises KeyError for names that don't match a registered feature.
+    """
+    if name in PRICE_COLUMNS:
+        return 'column', name, None
+    if name.startswith('@'):
+        kind, _, column = name.partition(':')
+        if kind in FEATURES and column in PRICE_COLUMNS:
+            return kind, column, None
+        raise KeyError(name)
+    if name in FEATURES:
+        return name, None, None
+    for kind in sorted(FEATURES, key=len, reverse=True):
+        if not name.startswith(kind + '_'):
+            continue
+        *column, window = name[len(kind) + 1:].split('_')
+        column = '_'.join(column) or 'close'
+        if window.isdigit() and int(window) > 0 and column in PRICE_COLUMNS:
+            return kind, column, int(window)
+    raise KeyError(name)
+
+
+def step_name(kind, column, window):
+    """
+    Canonical name of a step, so 'sma_7' and 'sma_close_7' are computed once.
+    """
+    if kind == 'column':
+        return column
+    if kind.startswith('@'):
+        return f'{kind}:{column}'
+    if window is None:
+        return kind
+    return f'{kind}_{column}_{window}'
+
+
+class FeaturePlan:
+    """
+    Compiled feature list: every step the requested features need, shared
+    intermediates included once, in dependency order. SMA / std / Bollinger
+    windows cost a few O(n) passes each, independent of the window length
+    (see _window_moments).
+
+    execute() works along the last axis, so a (K, T) block of tickers is
+    computed in the same passes as a single series.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.steps = []
+        self._specs = {}
+        self._needs = {}
+        self._outputs = [self._add(name, ()) for name in self.names]
+        # Index of the last step reading each step, so matrix() can free it after that
+        self._last_use = {step: i for i, step in enumerate(self.steps)}
+        for i, step in enumerate(self.steps):
+            for dependency in self._needs[step]:
+                self._last_use[dependency] = i
+
+    def _add(self, name, path):
+        try:
+            spec = parse_step(name)
+        except KeyError:
+            raise ValueError(f"Unknown feature '{name}'") from None
+        step = step_name(*spec)
+        if step in self._specs:
+            return step
+        if step in path:
+            raise ValueError(f"Feature '{name}' depends on itself")
+        kind, column, window = spec
+        needs = []
+        if kind != 'column':
+            needs = [self._add(dependency, path + (step,)) for dependency in FEATURES[kind][0](column, window)]
+        self._needs[step] = needs
+        self._specs[step] = spec
+        self.steps.append(step)
+        return step
+
+    @property
+    def lookback(self):
+        """
+        Earlier bars a row's features read (the longest window), or None when a
+        recursive feature depends on all of them.
+        """
+        longest = 0
+        for kind, _, window in self._specs.values():
+            if kind in RECURSIVE_KINDS:
+                return None
+            longest = max(longest, window or 0)
+        return longest
+
+    def execute(self, columns):
+        """
+        Compute the plan on price arrays {column: array (..., T)}.
+        Returns {feature name: float64 array (..., T)}, NaN where a window is
+        incomplete or touches a missing bar.
+        """
+        values = {}
+        for step in self.steps:
+            kind, column, window = self._specs[step]
+            if kind == 'column':
+                values[step] = np.asarray(columns[column], dtype=np.float64)
+            else:
+                values[step] = FEATURES[kind][1](values, column, window)
+        return {name: values[step] for name, step in zip(self.names, self._outputs)}
+
+    def matrix(self, columns, dtype=np.float64, order='F'):
+        """
+        Compute the plan straight into one preallocated (..., T, len(names))
+        array, column j holding names[j]. Each feature is written into its
+        column as soon as it is computed and every intermediate is released
+        after its last use, so the peak is the matrix plus the working set
+        of one step rather than every feature array at once. Fortran order
+        (the default) keeps each column contiguous for the writes and the
+        X'X product; dtype=np.float32 halves the matrix, the steps
+        themselves still run in float64.
+        """
+        shape = np.shape(columns['close'])
+        out = np.empty(shape + (len(self.names),), dtype=dtype, order=order)
+        targets = {}
+        for j, step in enumerate(self._outputs):
+            targets.setdefault(step, []).append(j)
+        values = {}
+        for i, step in enumerate(self.steps):
+            kind, column, window = self._specs[step]
+            if kind == 'column':
+                values[step] = np.asarray(columns[column], dtype=np.float64)
+            else:
+                values[step] = FEATURES[kind][1](values, column, window)
+            for j in targets.get(step, ()):
+                out[..., j] = values[step]
+            for done in (*self._needs[step], step):
+                if self._last_use[done] == i:
+                    values.pop(done, None)
+        return out
+
+
+def _window_diff(cumulative, window):
+    """
+    Sum over each trailing window from a running total with a leading zero,
+    NaN for the first window - 1 positions.
+    """
+    out = np.empty(cumulative.shape[:-1] + (cumulative.shape[-1] - 1,))
+    out[..., :window - 1] = np.nan
+    if window <= out.shape[-1]:
+        np.subtract(cumulative[..., window:], cumulative[..., :-window], out=out[..., window - 1:])
+    return out
+
+
+def _running(values):
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+    return out
+
+
+def _shift(values, periods):
+    out = np.full(values.shape, np.nan)
+    if periods < values.shape[-1]:
+        out[..., periods:] = values[..., :-periods]
+    return out
+
+
+def _ema(values, alpha):
+    """
+    Exponential moving average along the last axis (pandas adjust=False), as
+    one linear filter pass.
+    """
+    from scipy.signal import lfilter
+
+    if values.shape[-1] == 0:
+        return values.copy()
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], values, axis=-1, zi=(1 - alpha) * values[..., :1])
+    return out
+
+
+def _warm_up(values, source, window):
+    """
+    Blank the first window - 1 positions and the bars missing in the source.
+    """
+    values[..., :window - 1] = np.nan
+    values[np.isnan(source)] = np.nan
+    return values
+
+
+@feature('@missing')
+def missing_bars(values, column, window):
+    """
+    Running count of missing bars, None when nothing is missing.
+    """
+    missing = np.isnan(values[column])
+    return _running(missing.astype(np.float64)) if missing.any() else None
+
+
+@feature('@ffill')
+def forward_filled(values, column, window):
+    """
+    Column with missing bars carried forward, for the recursive filters.
+    """
+    x = values[column]
+    index = np.where(np.isnan(x), 0, np.arange(x.shape[-1]))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    return np.take_along_axis(x, index, axis=-1)
+
+
+@feature('range', needs=lambda column, window: ['high', 'low'])
+def price_range(values, column, window):
+    return values['high'] - values['low']
+
+
+def _drop_missing(out, missing, window):
+    """
+    NaN out windows that touch a missing bar (pandas' min_periods=window).
+    """
+    if missing is not None:
+        out[_window_diff(missing, window) > 0] = np.nan
+    return out
+
+
+def _window_moments(x, window, squares=True):
+    """
+    Trailing-window sums of x - ref and (x - ref)^2, ref being the mean of the
+    window-long block holding the window's last bar. The series is cut into
+    blocks of `window` bars, so every window is the head of one block plus the
+    tail of the previous one: both come from sums restarted at each block and
+    taken around that block's mean, the tail's moved onto the window's ref.
+    Rounding therefore scales with the spread of two blocks rather than with
+    running totals over the whole series, which cancel catastrophically on
+    long, low-volatility series. Missing bars count as ref.
+
+    Returns (ref, s1, s2) as (..., T) arrays, s1 and s2 NaN for the first
+    window - 1 positions; s2 is None unless squares.
+    """
+    n = x.shape[-1]
+    blocks = -(-n // window)
+    y = np.zeros(x.shape[:-1] + (blocks * window,))
+    y[..., :n] = x
+    missing = np.isnan(y).reshape(x.shape[:-1] + (blocks, window))
+    gaps = missing.any()
+    y = y.reshape(missing.shape)
+    # Bars per block, the last one's zero padding excluded
+    count = np.full(blocks, window)
+    count[-1:] -= blocks * window - n
+    if gaps:
+        y[missing] = 0.0
+        count = count - missing.sum(axis=-1)
+    ref = y.sum(axis=-1) / np.maximum(count, 1)
+    y -= ref[..., None]
+    if gaps:
+        y[missing] = 0.0
+    # Bars of the previous block in each window, and that block's ref on this one's
+    tail = np.arange(window - 1, -1, -1, dtype=np.float64)
+    shift = (ref[..., :-1] - ref[..., 1:])[..., None]
+
+    s1 = np.cumsum(y, axis=-1)
+    q1 = s1[..., :-1, -1:] - s1[..., :-1, :]
+    s2 = None
+    if squares:
+        y *= y
+        s2 = np.cumsum(y, axis=-1)
+        s2[..., 1:, :] += (s2[..., :-1, -1:] - s2[..., :-1, :]) + 2.0 * shift * q1 + tail * shift * shift
+        s2 = s2.reshape(x.shape[:-1] + (-1,))[..., :n]
+        s2[..., :window - 1] = np.nan
+    s1[..., 1:, :] += q1 + tail * shift
+    s1 = s1.reshape(x.shape[:-1] + (-1,))[..., :n]
+    s1[..., :window - 1] = np.nan
+    ref = np.repeat(ref, window, axis=-1)[..., :n]
+    return ref, s1, s2
+
+
+@feature('sma', needs=lambda column, window: [column, f'@missing:{column}'])
+def sma(values, column, window):
+    ref, out, _ = _window_moments(values[column], window, squares=False)
+    out /= window
+    out += ref
+    return _drop_missing(out, values[f'@missing:{column}'], window)
+
+
+@feature('std', needs=lambda column, window: [column, f'@missing:{column}'])
+def rolling_std(values, column, window):
+    """
+    Sample standard deviation (ddof=1) over the window, as pandas rolling().std().
+    """
+    if window < 2:
+        raise ValueError('std needs a window of at least 2')
+    _, s1, out = _window_moments(values[column], window)
+    s1 *= s1
+    s1 /= window
+    out -= s1
+    out /= window - 1
+    np.maximum(out, 0.0, out=out)
+    np.sqrt(out, out=out)
+    return _drop_missing(out, values[f'@missing:{column}'], window)
+
+
+@feature('bb_upper', needs=lambda column, window: [f'sma_{column}_{window}', f'std_{column}_{window}'])
+def bollinger_upper(values, column, window):
+    return values[f'sma_{column}_{window}'] + BOLLINGER_K * values[f'std_{column}_{window}']
+
+
+@feature('bb_lower', needs=lambda column, window: [f'sma_{column}_{window}', f'std_{column}_{window}'])
+def bollinger_lower(values, column, window):
+    return values[f'sma_{column}_{window}'] - BOLLINGER_K * values[f'std_{column}_{window}']
+
+
+@feature('ema', needs=lambda column, window: [column, f'@ffill:{column}'])
+def ema(values, column, window):
+    """
+    Span-`window` EMA (alpha = 2 / (window + 1)), undefined for the first window - 1 bars.
+    """
+    out = _ema(values[f'@ffill:{column}'], 2.0 / (window + 1))
+    return _warm_up(out, values[column], window)
+
+
+@feature('rsi', needs=lambda column, window: [column, f'@ffill:{column}'])
+def rsi(values, column, window):
+    """
+    Wilder's relative strength index (0-100); 50 on windows with no movement.
+    """
+    change = np.diff(values[f'@ffill:{column}'], axis=-1)
+    gain = np.full(values[column].shape, np.nan)
+    loss = np.full(values[column].shape, np.nan)
+    gain[..., 1:] = _ema(np.maximum(change, 0.0), 1.0 / window)
+    loss[..., 1:] = _ema(np.maximum(-change, 0.0), 1.0 / window)
+    total = gain + loss
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(total > 0, 100.0 * gain / total, 50.0)
+    return _warm_up(out, values[column], window + 1)
+
+
+@feature('return', needs=lambda column, window: [column])
+def pct_return(values, column, window):
+    """
+    Return over `window` bars: x[t] / x[t - window] - 1.
+    """
+    x = values[column]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / _shift(x, window) - 1.0
+
+
+@feature('lag', needs=lambda column, window: [column])
+def lag(values, column, window):
+    return _shift(values[column], window)
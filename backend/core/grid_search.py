@@ -0,0 +1,227 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .features import FeaturePlan
+from .main_model import FEATURE_SPECS, script_dir
+from .model_cache import file_fingerprint
+from .price_store import STORE_DIR, load_prices
+from .regression import IncrementalOLS, regression_metrics
+from .tickers import TICKERS
+
+RESULTS_PATH = os.path.join(STORE_DIR, 'grid_search.jsonl')
+
+# Configurations evaluated per worker task; the feature columns are computed once per task
+CONFIG_CHUNK = 16
+
+# Feature sets name feature templates; '{window}' is filled from `windows`
+DEFAULT_GRID = {
+    'feature_sets': {
+        'model': list(FEATURE_SPECS.values()),
+        'prices': ['open', 'high', 'low', 'close', 'volume', 'range'],
+        'trend': ['open', 'high', 'low', 'close', 'volume', 'range', 'sma_{window}', 'std_{window}'],
+        'momentum': ['close', 'volume', 'ema_{window}', 'rsi_{window}', 'return_1', 'lag_1'],
+        'bands': ['close', 'sma_{window}', 'bb_upper_{window}', 'bb_lower_{window}'],
+    },
+    'windows': [7, 14, 30, 50],
+    'splits': [0.7, 0.8, 0.9],
+}
+
+
+def grid_configs(grid):
+    """
+    Expand a grid into [(config_id, feature_set, window, split, feature names)].
+    Feature sets without a '{window}' template are not repeated per window.
+    Raises ValueError for unknown features or splits outside (0, 1).
+    """
+    configs = []
+    for (set_name, templates), split in itertools.product(grid['feature_sets'].items(), grid['splits']):
+        if not 0 < split < 1:
+            raise ValueError(f'Train split must be between 0 and 1, got {split}')
+        windowed = any('{window}' in template for template in templates)
+        for window in grid['windows'] if windowed else [None]:
+            names = [template.format(window=window) for template in templates]
+            FeaturePlan(names)
+            config_id = f'{set_name}|w={window}|split={split}' if windowed else f'{set_name}|split={split}'
+            configs.append((config_id, set_name, window, split, names))
+    return configs
+
+
+def feature_key(names):
+    """
+    Short digest of a configuration's resolved feature names. It is part of
+    the resume key, so changing a feature set's contents (e.g. FEATURE_SPECS
+    behind 'model') re-evaluates it instead of reusing stale records.
+    """
+    return hashlib.sha1('\n'.join(names).encode()).hexdigest()[:12]
+
+
+def source_key(filename):
+    """
+    (mtime_ns, size) of a ticker's price file, the data part of the resume
+    key: records scored on an older version of the file are evaluated again.
+    """
+    _, mtime_ns, size = file_fingerprint(os.path.join(script_dir, filename))
+    return mtime_ns, size
+
+
+def evaluate(features, target, names, split):
+    """
+    Chronological train/test split and OLS fit on the rows where every named
+    feature and the target are defined, as analyze_stock does for its features.
+    """
+    X = np.column_stack([features[name] for name in names])
+    valid = np.isfinite(X).all(axis=1) & np.isfinite(target)
+    X, y = X[valid], target[valid]
+    split_index = int(len(X) * split)
+    if split_index == 0 or split_index == len(X):
+        raise ValueError('Not enough data to create a train and a test set')
+    model = IncrementalOLS().fit(X[:split_index], y[:split_index])
+    rmse, mape, r2 = regression_metrics(y[split_index:], model.predict(X[split_index:]))
+    return {'rmse': float(rmse), 'mape': float(mape), 'r2': float(r2), 'train_rows': split_index, 'test_rows': len(X) - split_index}
+
+
+def _evaluate_chunk(task):
+    """
+    Worker: every configuration in the task against one ticker. Columns for
+    the union of their features are computed in one plan and shared.
+    """
+    symbol, filename, configs = task
+    start = time.perf_counter()
+    source = source_key(filename)
+    prices = load_prices(os.path.join(script_dir, filename))
+    features = FeaturePlan(sorted({name for *_, names in configs for name in names})).execute(prices)
+    target = np.full(len(prices['close']), np.nan)
+    target[:-1] = prices['close'][1:]
+
+    records = []
+    for config_id, set_name, window, split, names in configs:
+        record = {
+            'config': config_id, 'features': feature_key(names), 'source': list(source), 'symbol': symbol,
+            'feature_set': set_name, 'window': window, 'split': split,
+        }
+        try:
+            record.update(evaluate(features, target, names, split))
+        except ValueError as e:
+            record['error'] = str(e)
+        records.append(record)
+    return records, time.perf_counter() - start
+
+
+def load_results(results_path=RESULTS_PATH):
+    """
+    Records already written by earlier (possibly interrupted) runs, keyed by
+    (config, feature key, source key, symbol).
+    """
+    done = {}
+    try:
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short when a run was killed; it is evaluated again
+                    continue
+                source = tuple(record['source']) if 'source' in record else None
+                done[record['config'], record.get('features'), source, record['symbol']] = record
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def rank_results(records):
+    """
+    One row per configuration, averaged over tickers and ranked by mean MAPE.
+    """
+    by_config = {}
+    for record in records:
+        by_config.setdefault(record['config'], []).append(record)
+    rows = []
+    for config_id, group in by_config.items():
+        ok = [r for r in group if 'error' not in r]
+        if not ok:
+            continue
+        rows.append({
+            'config': config_id,
+            'feature_set': ok[0]['feature_set'],
+            'window': ok[0]['window'],
+            'split': ok[0]['split'],
+            'tickers': len(ok),
+            'mean_mape': float(np.mean([r['mape'] for r in ok])),
+            'worst_mape': float(np.max([r['mape'] for r in ok])),
+            'mean_r2': float(np.mean([r['r2'] for r in ok])),
+        })
+    rows.sort(key=lambda row: row['mean_mape'])
+    return rows
+
+
+def _end_partial_line(f):
+    """
+    Start appending on a fresh line if a killed run left half a record at the end.
+    """
+    size = f.seek(0, os.SEEK_END)
+    if size:
+        f.seek(size - 1)
+        if f.read(1) != '\n':
+            f.write('\n')
+
+
+def write_table(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['rank', *rows[0]] if rows else ['rank'])
+        writer.writeheader()
+        for rank, row in enumerate(rows, 1):
+            writer.writerow({'rank': rank, **row})
+
+
+def run_grid_search(grid=DEFAULT_GRID, tickers=None, results_path=RESULTS_PATH, workers=None, progress=None):
+    """
+    Evaluate every grid configuration on every ticker in a process pool.
+    Each finished record is appended to results_path right away, and records
+    already there are skipped, so an interrupted sweep resumes where it stopped.
+    Returns (ranked rows, number of evaluations run now, wall seconds).
+    """
+    tickers = TICKERS if tickers is None else tickers
+    configs = grid_configs(grid)
+    done = load_results(results_path)
+
+    sources = {symbol: source_key(filename) for symbol, (filename, _) in tickers.items()}
+    tasks = []
+    for symbol, (filename, _) in tickers.items():
+        pending = [
+            config for config in configs
+            if (config[0], feature_key(config[4]), sources[symbol], symbol) not in done
+        ]
+        for start in range(0, len(pending), CONFIG_CHUNK):
+            tasks.append((symbol, filename, pending[start:start + CONFIG_CHUNK]))
+
+    wall_start = time.perf_counter()
+    evaluated = 0
+    if tasks:
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+        with open(results_path, 'a+') as out, ProcessPoolExecutor(max_workers=workers) as pool:
+            _end_partial_line(out)
+            for future in as_completed([pool.submit(_evaluate_chunk, task) for task in tasks]):
+                records, seconds = future.result()
+                for record in records:
+                    out.write(json.dumps(record) + '\n')
+                    done[record['config'], record['features'], tuple(record['source']), record['symbol']] = record
+                out.flush()
+                evaluated += len(records)
+                if progress:
+                    progress(records, seconds)
+
+    wanted = {(config[0], feature_key(config[4])) for config in configs}
+    # Again, in case a file changed while the sweep ran
+    sources = {symbol: source_key(filename) for symbol, (filename, _) in tickers.items()}
+    records = [
+        r for (config_id, features, source, symbol), r in done.items()
+        if (config_id, features) in wanted and symbol in sources and sources[symbol] == source
+    ]
+    return rank_results(records), evaluated, time.perf_counter() - wall_start
@@ -0,0 +1,126 @@
+import numpy as np
+
+from .price_store import DAY_NS
+
+# Calendar days covered by each history range, measured back from the latest bar
+RANGE_DAYS = {
+    '1d': 1,
+    '1w': 7,
+    '1m': 31,
+    '3m': 92,
+    '6m': 183,
+    '1y': 366,
+    '5y': 1827,
+    'max': None,
+}
+
+# Bounds on points per response, whatever the range; LTTB keeps the first and last bar plus one per bucket
+MAX_POINTS = 500
+MIN_POINTS = 3
+
+AGGREGATIONS = ('lttb', 'ohlc')
+
+
+def window(prices, range_param):
+    """
+    Slice the date-sorted columns to the requested range with a binary search
+    on the date column. Raises KeyError for an unknown range.
+    """
+    days = RANGE_DAYS[range_param]
+    dates = prices['date']
+    if days is None or len(dates) == 0:
+        return prices
+    lo = np.searchsorted(dates, dates[-1] - days * DAY_NS, side='left')
+    return {name: values[lo:] for name, values in prices.items()}
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of the n_out points that best
+    preserve the visual shape of y(x). First and last points are always kept;
+    below 3 points only the last (n_out=1) or both ends (n_out=2).
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1], dtype=np.int64)[2 - max(n_out, 0):]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Mean point of every bucket up front; bucket i is anchored on the mean of bucket i + 1
+    counts = np.diff(np.append(edges, n))
+    x_mean = np.add.reduceat(x[1:], edges - 1) / counts
+    y_mean = np.add.reduceat(y[1:], edges - 1) / counts
+    x_mean[-1], y_mean[-1] = x[-1], y[-1]
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xc, yc = x_mean[i + 1], y_mean[i + 1]
+        xa, ya = x[a], y[a]
+        areas = np.abs((xa - xc) * (y[lo:hi] - ya) - (xa - x[lo:hi]) * (yc - ya))
+        a = lo + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def ohlc_buckets(prices, n_out):
+    """
+    Aggregate into at most n_out equal-count buckets with reduceat.
+    """
+    n = len(prices['date'])
+    starts = np.unique(np.linspace(0, n, n_out + 1).astype(np.int64)[:-1])
+    ends = np.append(starts[1:], n)
+    return {
+        'date': prices['date'][starts],
+        'open': prices['open'][starts],
+        'high': np.maximum.reduceat(prices['high'], starts),
+        'low': np.minimum.reduceat(prices['low'], starts),
+        'close': prices['close'][ends - 1],
+        'volume': np.add.reduceat(prices['volume'], starts),
+    }
+
+
+def price_history(prices, range_param='1m', max_points=MAX_POINTS, agg='lttb'):
+    """
+    History rows for a range, downsampled on the server to at most max_points.
+    Returns (rows, number of bars in the range before downsampling).
+    """
+    prices = window(prices, range_param)
+
+    # Drop incomplete bars (e.g. the blank 1981-08-10 row in Apple)
+    valid = ~np.isnan(prices['close'])
+    if not valid.all():
+        prices = {name: values[valid] for name, values in prices.items()}
+    # A blank volume cell counts as no trading, as in market.latest_bars
+    volume = np.asarray(prices['volume'], dtype=np.float64)
+    if np.isnan(volume).any():
+        prices = {**prices, 'volume': np.nan_to_num(volume, nan=0.0)}
+    total = len(prices['date'])
+    max_points = max(MIN_POINTS, min(max_points, MAX_POINTS))
+
+    if agg == 'ohlc' and total > max_points:
+        prices = ohlc_buckets(prices, max_points)
+    elif total > max_points:
+        x = prices['date'].astype(np.float64)
+        keep = lttb_indices(x, np.asarray(prices['close'], dtype=np.float64), max_points)
+        prices = {name: values[keep] for name, values in prices.items()}
+
+    dates = np.datetime_as_string(np.asarray(prices['date']).view('datetime64[ns]'), unit='D').tolist()
+    closes = np.asarray(prices['close'], dtype=np.float64).tolist()
+    volumes = np.asarray(prices['volume']).astype(np.int64).tolist()
+    if agg == 'ohlc':
+        opens = np.asarray(prices['open'], dtype=np.float64).tolist()
+        highs = np.asarray(prices['high'], dtype=np.float64).tolist()
+        lows = np.asarray(prices['low'], dtype=np.float64).tolist()
+        rows = [
+            {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'price': c, 'volume': v}
+            for d, o, h, l, c, v in zip(dates, opens, highs, lows, closes, volumes)
+        ]
+    else:
+        rows = [{'date': d, 'price': c, 'volume': v} for d, c, v in zip(dates, closes, volumes)]
+    return rows, total
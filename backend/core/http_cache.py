@@ -0,0 +1,118 @@
+import datetime
+import hashlib
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .main_model import FEATURE_CONFIG, MODEL_VERSION, script_dir
+from .model_cache import file_fingerprint
+from .models import Prediction
+from .price_store import db_fingerprint
+from .tickers import STOCK_CHOICES, TICKERS, ticker_file
+
+
+def make_etag(request, fingerprint):
+    """
+    Strong ETag over the data fingerprint, the model version and the
+    representation (path with query, Accept header).
+    """
+    key = repr((fingerprint, MODEL_VERSION, FEATURE_CONFIG, request.get_full_path(), request.META.get('HTTP_ACCEPT')))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional_api(etag_func, last_modified_func=None):
+    """
+    Decorator for APIView.dispatch (apply with method_decorator): answer
+    If-None-Match / If-Modified-Since with 304 before the view body runs,
+    and let browsers and CDNs reuse successful responses for a few seconds.
+    """
+    def decorator(view_func):
+        view_func = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                # condition() tags every response; errors must not be cached or revalidated
+                for header in ('ETag', 'Last-Modified'):
+                    if response.has_header(header):
+                        del response[header]
+            else:
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=settings.API_CACHE_MAX_AGE,
+                    stale_while_revalidate=settings.API_CACHE_STALE_WHILE_REVALIDATE,
+                )
+            patch_vary_headers(response, ('Accept',))
+            return response
+        return wrapper
+    return decorator
+
+
+def _file_fingerprint(filename):
+    try:
+        return file_fingerprint(os.path.join(script_dir, filename))
+    except FileNotFoundError:
+        return None
+
+
+def _mtime(fingerprint):
+    # fingerprint is (path, mtime_ns, size)
+    return datetime.datetime.fromtimestamp(fingerprint[1] / 1e9, tz=datetime.timezone.utc)
+
+
+def _choice_fingerprint(request):
+    try:
+        symbol = STOCK_CHOICES[int(request.GET.get('choice', 0))]
+    except (KeyError, ValueError):
+        return None
+    return _file_fingerprint(TICKERS[symbol][0])
+
+
+def stock_etag(request, *args, **kwargs):
+    fingerprint = _choice_fingerprint(request)
+    return make_etag(request, fingerprint) if fingerprint else None
+
+
+def stock_last_modified(request, *args, **kwargs):
+    fingerprint = _choice_fingerprint(request)
+    return _mtime(fingerprint) if fingerprint else None
+
+
+def _detail_fingerprint(request, symbol):
+    if not symbol:
+        return None
+    if request.GET.get('source') == 'db' and 'history' not in request.path:
+        return db_fingerprint(symbol.upper())
+    return _file_fingerprint(ticker_file(symbol)[0])
+
+
+def stock_detail_etag(request, symbol=None):
+    fingerprint = _detail_fingerprint(request, symbol)
+    return make_etag(request, fingerprint) if fingerprint else None
+
+
+def stock_detail_last_modified(request, symbol=None):
+    fingerprint = _detail_fingerprint(request, symbol)
+    if not fingerprint:
+        return None
+    # Database fingerprints end with the symbol's latest updated_at
+    return fingerprint[-1] if fingerprint[0] == 'db' else _mtime(fingerprint)
+
+
+def _prediction_fingerprint():
+    stats = Prediction.objects.aggregate(rows=Count('id'), updated=Max('updated_at'))
+    return stats['rows'], stats['updated']
+
+
+def prediction_etag(request, *args, **kwargs):
+    return make_etag(request, _prediction_fingerprint())
+
+
+def prediction_last_modified(request, *args, **kwargs):
+    return _prediction_fingerprint()[1]
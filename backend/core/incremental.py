@@ -0,0 +1,215 @@
+import json
+import math
+import os
+from collections import deque
+
+import numpy as np
+
+from .model_cache import file_fingerprint
+from .price_store import STORE_DIR, append_npy, refresh_artifact
+from .tickers import symbol_for_file
+
+# Rolling features maintained per appended bar (same windows as analyze_stock)
+MEAN_WINDOWS = {'MA_7': 7, 'MA_30': 30}
+STD_WINDOWS = {'Std_7': 7}
+WINDOW = max(*MEAN_WINDOWS.values(), *STD_WINDOWS.values())
+
+# Feature row produced by FeatureState.append, in order
+STATE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', *MEAN_WINDOWS, *STD_WINDOWS, 'Range')
+
+PRICE_FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+STATE_DIR = os.path.join(STORE_DIR, 'features')
+
+
+class FeatureState:
+    """
+    Rolling-window state for one symbol: a ring buffer of the last WINDOW
+    closes, the date of the last bar seen, and the source file (mtime_ns,
+    size) and feature columns of the matrix persisted next to it.
+
+    Every appended bar costs O(WINDOW): each window statistic is recomputed
+    from the buffer with an exactly rounded sum, so the values agree with
+    pandas' rolling mean/std instead of drifting like a running sum would.
+    """
+
+    def __init__(self, symbol, closes=(), last_date=None, bars=0, source=None, columns=None):
+        self.symbol = symbol
+        self.closes = deque(closes, maxlen=WINDOW)
+        self.last_date = last_date
+        self.bars = bars
+        self.source = source
+        self.columns = columns
+
+    def append(self, date, open_price, high, low, close, volume):
+        """
+        Add one bar (date as epoch nanoseconds) and return its feature row.
+        """
+        self.closes.append(float(close))
+        self.last_date = int(date)
+        self.bars += 1
+
+        row = {
+            'date': self.last_date,
+            'Open': float(open_price),
+            'High': float(high),
+            'Low': float(low),
+            'Close': float(close),
+            'Volume': float(volume),
+        }
+        for name, window in MEAN_WINDOWS.items():
+            row[name] = self._mean(window)
+        for name, window in STD_WINDOWS.items():
+            row[name] = self._std(window)
+        row['Range'] = row['High'] - row['Low']
+        return row
+
+    def _tail(self, window):
+        if len(self.closes) < window:
+            return None
+        values = list(self.closes)[-window:]
+        # pandas leaves any window containing a missing close as NaN
+        if any(math.isnan(v) for v in values):
+            return None
+        return values
+
+    def _mean(self, window):
+        values = self._tail(window)
+        if values is None:
+            return math.nan
+        return math.fsum(values) / window
+
+    def _std(self, window):
+        values = self._tail(window)
+        if values is None:
+            return math.nan
+        mean = math.fsum(values) / window
+        return math.sqrt(math.fsum((v - mean) ** 2 for v in values) / (window - 1))
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'closes': list(self.closes),
+            'last_date': self.last_date,
+            'bars': self.bars,
+            'source': self.source,
+            'columns': self.columns,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['symbol'], data['closes'], data['last_date'], data['bars'],
+            data.get('source'), data.get('columns'),
+        )
+
+
+def state_path(symbol, state_dir=None):
+    return os.path.join(state_dir or STATE_DIR, f'{symbol}.json')
+
+
+def matrix_path(symbol, state_dir=None):
+    return os.path.join(state_dir or STATE_DIR, f'{symbol}.npy')
+
+
+def load_state(symbol, state_dir=None):
+    try:
+        with open(state_path(symbol, state_dir)) as f:
+            return FeatureState.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def save_state(state, state_dir=None):
+    path = state_path(state.symbol, state_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def _matrix_rows(symbol, state_dir=None):
+    try:
+        return len(np.load(matrix_path(symbol, state_dir), mmap_mode='r'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_matrix(symbol, matrix, state_dir=None):
+    path = matrix_path(symbol, state_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}.npy'
+    np.save(tmp, np.ascontiguousarray(matrix))
+    os.replace(tmp, path)
+
+
+def refresh_features(source_path, state_dir=None, store_dir=None):
+    """
+    Bring the price store and the persisted features of a price file up to
+    date and return the feature rows of the bars appended since the last
+    refresh.
+
+    Bars appended to the file are appended to the store in place
+    (refresh_artifact), run through the rolling state and appended to the
+    symbol's feature matrix, so a refresh costs O(new bars * WINDOW).
+    A symbol without state (or whose history changed) is seeded: the state
+    from its last WINDOW bars, the matrix from one FeaturePlan pass.
+    analyze_stock reads the matrix back through load_features.
+    """
+    # main_model imports this module's load_features
+    from .main_model import FEATURE_PLAN, features_list
+
+    symbol = symbol_for_file(source_path)
+    prices = refresh_artifact(source_path, store_dir)
+    dates = prices['date']
+    source = list(file_fingerprint(source_path)[1:])
+    # The matrix holds the model's features only while they are the ones the state computes
+    columns = list(features_list) if set(features_list) == set(STATE_COLUMNS) else None
+    state = load_state(symbol, state_dir)
+
+    if (state is None or state.columns != columns or not 0 < state.bars <= len(dates)
+            or int(dates[state.bars - 1]) != state.last_date
+            or (columns and _matrix_rows(symbol, state_dir) != state.bars)):
+        state = FeatureState(symbol, columns=columns)
+        for i in range(max(0, len(dates) - WINDOW), len(dates)):
+            state.append(*(prices[name][i] for name in PRICE_FIELDS))
+        state.bars = len(dates)
+        if columns:
+            _save_matrix(symbol, FEATURE_PLAN.matrix(prices, np.float64, order='C'), state_dir)
+        state.source = source
+        save_state(state, state_dir)
+        return []
+
+    rows = [
+        state.append(*(prices[name][i] for name in PRICE_FIELDS))
+        for i in range(state.bars, len(dates))
+    ]
+    if columns and rows:
+        new = np.array([[row[name] for name in columns] for row in rows], dtype=np.float64)
+        if not append_npy(matrix_path(symbol, state_dir), new):
+            _save_matrix(symbol, FEATURE_PLAN.matrix(prices, np.float64, order='C'), state_dir)
+    if rows or state.source != source:
+        state.source = source
+        save_state(state, state_dir)
+    return rows
+
+
+def load_features(source_path, columns, rows, state_dir=None):
+    """
+    The persisted feature matrix of a price file (memory-mapped, one row per
+    bar, NaN in warm-up rows) when refresh_features last ran against the
+    file as it is now, has `rows` bars and these columns; else None.
+    """
+    state = load_state(symbol_for_file(source_path), state_dir)
+    if state is None or state.columns != list(columns) or state.bars != rows:
+        return None
+    try:
+        if state.source != list(file_fingerprint(source_path)[1:]):
+            return None
+        matrix = np.load(matrix_path(state.symbol, state_dir), mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        return None
+    if matrix.shape != (rows, len(columns)):
+        return None
+    return matrix
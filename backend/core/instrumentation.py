@@ -0,0 +1,97 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket bounds in seconds, from a cache hit to a cold fit of the longest history
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, seconds) spans of the request being handled, set by
+# core.middleware.TimingMiddleware; None outside a request
+request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def _labels(pairs):
+    return '{' + ','.join(pairs) + '}'
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram with one series per label set.
+    Per process: each gunicorn worker exports its own.
+    """
+
+    def __init__(self, name, documentation, label_names, buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += seconds
+            series['count'] += 1
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, labels)]
+                bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+                counts = series['counts'] + [series['count']]
+                for bound, count in zip(bounds, counts):
+                    lines.append(f'{self.name}_bucket{_labels(pairs + [bound])} {count}')
+                lines.append(f'{self.name}_sum{_labels(pairs)} {series["sum"]}')
+                lines.append(f'{self.name}_count{_labels(pairs)} {series["count"]}')
+        return '\n'.join(lines)
+
+
+STAGE_SECONDS = Histogram(
+    'devstock_stage_seconds', 'Time spent in each analyze_stock stage and in response rendering', ('stage',),
+)
+REQUEST_SECONDS = Histogram(
+    'devstock_request_seconds', 'API request latency', ('view', 'method', 'status'),
+)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block as stage `name`: recorded in STAGE_SECONDS and, inside a
+    request, reported in its Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, name)
+        spans = request_spans.get()
+        if spans is not None:
+            spans.append((name, seconds))
+
+
+def render_metrics():
+    """
+    Prometheus text exposition of this process's histograms.
+    """
+    return '\n'.join(histogram.exposition() for histogram in (STAGE_SECONDS, REQUEST_SECONDS)) + '\n'
+
+
+def server_timing(spans, total):
+    """
+    Server-Timing header value: repeated stages summed, in first-seen order, then the total.
+    """
+    durations = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in durations.items())
@@ -1,54 +1,260 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_percentage_error
-import matplotlib.pyplot as plt
+import logging
 import numpy as np
 import os 
+from .features import FeaturePlan
+from .incremental import load_features
+from .instrumentation import span
+from .model_artifacts import TAIL_BARS, load_model_artifact, save_model_artifact
+from .model_cache import CachedModel, file_fingerprint, model_cache
+from .price_store import CHUNK_BYTES, db_fingerprint, load_prices, prices_from_db, slice_dates
+from .regression import IncrementalOLS, MultiTargetOLS, regression_metrics
+from .streaming import stream_fit
 
 # Get the absolute path to the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__)) 
 
-def analyze_stock(csv_filename, company_name):
+logger = logging.getLogger(__name__)
+
+# pandas is imported inside the functions that build DataFrames: every Django
+# process imports this module through core.views, and most never fit a model
+
+# Model configuration, part of the cache key so changing it invalidates cached fits
+# Model column -> feature name in core.features (e.g. 'ema_12', 'rsi_14', 'bb_upper_20')
+FEATURE_SPECS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+    'MA_7': 'sma_7',
+    'MA_30': 'sma_30',
+    'Std_7': 'std_7',
+    'Range': 'range',
+}
+features_list = list(FEATURE_SPECS)
+split_percentage = 0.8
+# Feature matrix precision: 'float32' halves its memory (the fit still accumulates in float64)
+FEATURE_DTYPE = np.dtype(os.environ.get('FEATURE_DTYPE', 'float64'))
+FEATURE_CONFIG = (tuple(FEATURE_SPECS.items()), split_percentage, FEATURE_DTYPE.name)
+FEATURE_PLAN = FeaturePlan(FEATURE_SPECS.values())
+
+# Bump when the features or the fitting method change; stored with precomputed predictions
+MODEL_VERSION = 'ols-v1'
+
+# Bars ahead forecast by the multi-horizon mode (analyze_stock(horizons=...), ?horizons=1,5,20)
+HORIZONS = (1, 5, 20)
+MAX_HORIZON = 252
+
+# Price files at least this large are analysed in chunks (stream_stock_model) instead of loaded whole
+STREAM_THRESHOLD_BYTES = int(os.environ.get('STREAM_THRESHOLD_BYTES', 512 * 2**20))
+
+
+def analyze_stock(csv_filename, company_name, source='file', symbol=None, start=None, end=None, horizons=None):
     """
     This function loads a stock CSV, trains a linear regression model,
     and returns prediction data for visualization.
+    With source='db' the prices for `symbol` are read from core.Stock instead.
+    start / end (datetime.date, inclusive) restrict the history the model is fit on.
+    Fitted models are cached per process until the data changes.
+    Price files of STREAM_THRESHOLD_BYTES or more are streamed rather than loaded.
+    horizons (e.g. (1, 5, 20)) returns fit_horizons' multi-horizon payload instead.
+    Each stage is timed as a core.instrumentation span.
     """
     
     #  1. Load the data 
-    file_path = os.path.join(script_dir, csv_filename) 
-    
-    try:
-        df = pd.read_csv(file_path) 
-    except FileNotFoundError:
-        print(f"Error: The file '{file_path}' was not found.") 
-        print("Please make sure the CSV file is in the same directory as the script.\n")
-        return {} # Exit the function
+    with span('cache'):
+        if source == 'db':
+            fingerprint = db_fingerprint(symbol)
+            if fingerprint is None:
+                logger.error("No rows for '%s' in the Stock table.", symbol)
+                return {}
+        elif source == 'file':
+            file_path = os.path.join(script_dir, csv_filename) 
+            try:
+                fingerprint = file_fingerprint(file_path)
+            except FileNotFoundError:
+                logger.error("The file '%s' was not found. Please make sure the CSV file is in the same directory as the script.", file_path)
+                return {} # Exit the function
+        else:
+            raise ValueError(f"Unknown source '{source}', expected 'file' or 'db'")
+
+        cache_key = (fingerprint, company_name, start, end, FEATURE_CONFIG, horizons)
+        cached = model_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached.result)
+
+    # Any price file, whatever its extension: the .xls ones are CSV too and read_chunks parses them
+    if horizons is None and source == 'file' and fingerprint[2] >= STREAM_THRESHOLD_BYTES:
+        model, result, prices = stream_stock_model(file_path, company_name, start, end)
+    else:
+        features = None
+        with span('load'):
+            if source == 'db':
+                prices = prices_from_db(symbol, start, end)
+            else:
+                prices = slice_dates(load_prices(file_path), start, end)
+                if start is None and end is None:
+                    # Kept up to date by the refresh_features command
+                    features = load_features(file_path, features_list, len(prices['date']))
+
+        if horizons is None:
+            model, result = fit_stock_model(prices, company_name, features=features)
+        else:
+            model, result = fit_horizons(prices, company_name, horizons, features=features)
+    if result:
+        model_cache.put(cache_key, CachedModel(model, result))
+        if source == 'file' and start is None and end is None and horizons is None:
+            # Full-history fits are what warm_start() preloads in new workers
+            try:
+                with span('artifact'):
+                    save_model_artifact(file_path, model, result, prices, MODEL_VERSION, FEATURE_CONFIG)
+            except OSError as e:
+                logger.warning("Could not save the model artifact for '%s': %s", csv_filename, e)
+        return dict(result)
+    return result
+
+def warm_start(tickers=None):
+    """
+    Load the persisted full-history fits into this process's model cache, so
+    the first request for each ticker is a cache hit. Artifacts built from an
+    older data file, model version or feature set are skipped (and rebuilt by
+    the next analyze_stock call). Returns the number of models loaded.
+    """
+    from .tickers import TICKERS
+
+    loaded = 0
+    for csv_filename, company_name in (TICKERS if tickers is None else tickers).values():
+        file_path = os.path.join(script_dir, csv_filename)
+        artifact = load_model_artifact(file_path, MODEL_VERSION, FEATURE_CONFIG)
+        if artifact is None:
+            continue
+        cached, _ = artifact
+        if cached.result['company'] != company_name:
+            continue
+        model_cache.put((file_fingerprint(file_path), company_name, None, None, FEATURE_CONFIG, None), cached)
+        loaded += 1
+    return loaded
+
+def build_features(prices):
+    """
+    Feature table with a next-day Target column, warm-up and incomplete rows dropped.
+    """
+    import pandas as pd
 
     # 2. Data Preparation
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.set_index('Date')
-    df = df.sort_index() 
-    
-    # 3. Create Target Variable 
-    df['Target'] = df['Close'].shift(-1)
-
-    # 4. Feature Engineering 
-    df['MA_7'] = df['Close'].rolling(window=7).mean()
-    df['MA_30'] = df['Close'].rolling(window=30).mean()
-    df['Std_7'] = df['Close'].rolling(window=7).std()
-    df['Range'] = df['High'] - df['Low']
+    dates = pd.DatetimeIndex(prices['date'].view('datetime64[ns]'), name='Date')
+
+    # 3. Feature Engineering (one shared pass per column, see core.features)
+    features = FEATURE_PLAN.execute(prices)
+    df = pd.DataFrame({name: features[spec] for name, spec in FEATURE_SPECS.items()}, index=dates)
+
+    # 4. Create Target Variable 
+    df['Target'] = pd.Series(prices['close'], index=dates).shift(-1)
     
-    df = df.dropna()
+    return df.dropna()
+
+def feature_matrix(prices, dtype=None, horizons=None, features=None):
+    """
+    The rows build_features keeps, without the DataFrame: (dates, X, y) with
+    X a Fortran-ordered (rows, features_list) array of dtype (default
+    FEATURE_DTYPE) built in place by FeaturePlan.matrix, and y the next
+    day's close. Warm-up rows and the last bar are trimmed by slicing, so X
+    is a view; only a series with gaps inside it pays for a masked copy.
 
-    # 5. Define Features (X) and Target (y) 
-    features_list = ['Open', 'High', 'Low', 'Close', 'Volume', 'MA_7', 'MA_30', 'Std_7', 'Range']
-    X = df[features_list]
-    y = df['Target']
+    With horizons, y is (rows, len(horizons)): the close h bars ahead for
+    each h, on the rows that have all of them.
+
+    features is a precomputed (bars, features_list) matrix of prices, e.g.
+    the one persisted by core.incremental; it is used instead of running
+    FEATURE_PLAN.
+    """
+    dtype = FEATURE_DTYPE if dtype is None else np.dtype(dtype)
+    if features is None:
+        X = FEATURE_PLAN.matrix(prices, dtype)
+    else:
+        X = features if features.dtype == dtype else features.astype(dtype)
+    close = np.asarray(prices['close'], dtype=np.float64)
+    n = max(len(close) - (1 if horizons is None else max(horizons)), 0)
+    if horizons is None:
+        y = close[1:n + 1]
+        valid = ~np.isnan(X[:n]).any(axis=1) & ~np.isnan(y)
+    else:
+        y = np.empty((n, len(horizons)), order='F')
+        for j, h in enumerate(horizons):
+            y[:, j] = close[h:n + h]
+        valid = ~np.isnan(X[:n]).any(axis=1) & ~np.isnan(y).any(axis=1)
+    dates, X = prices['date'][:n], X[:n]
+    first = int(valid.argmax()) if valid.any() else len(valid)
+    if valid[first:].all():
+        return dates[first:], X[first:], y[first:]
+    rows = np.flatnonzero(valid)
+    return dates[rows], _take_rows(X, rows), _take_rows(y, rows) if y.ndim == 2 else y[rows]
+
+def _take_rows(matrix, rows):
+    # Fancy indexing would return C order; the fit and metrics read whole columns
+    return np.take(matrix, rows, axis=0, out=np.empty((len(rows), matrix.shape[1]), dtype=matrix.dtype, order='F'))
+
+def fit_horizons(prices, company_name, horizons=HORIZONS, verbose=True, features=None):
+    """
+    fit_stock_model for several horizons at once: the close 1, 5, 20, ...
+    bars ahead, all fit on the same rows and chronological split with one
+    shared X'X factorisation (MultiTargetOLS), so k horizons cost about one.
+    Returns (model, result); result holds the shared test dates and, per
+    horizon, the actual and predicted prices and metrics.
+    """
+    with span('features'):
+        dates, X, Y = feature_matrix(prices, horizons=horizons, features=features)
+
+    split_index = int(len(Y) * split_percentage)
+    if len(Y) - split_index == 0:
+        logger.error("Not enough data for %s to create a test set. Need more data.", company_name)
+        return None, {}
+
+    with span('fit'):
+        model = MultiTargetOLS().fit(X[:split_index], Y[:split_index])
+
+    with span('metrics'):
+        Y_test = Y[split_index:]
+        Y_pred = model.predict(X[split_index:])
+        rmse, mape, r2 = regression_metrics(Y_test, Y_pred)
+
+    if verbose:
+        for j, horizon in enumerate(horizons):
+            logger.info("\n--- %d-bar horizon ---", horizon)
+            log_performance(rmse[j], mape[j], r2[j])
+
+    with span('serialize'):
+        result = {
+            'company': company_name,
+            'dates': np.datetime_as_string(dates[split_index:].astype('datetime64[ns]'), unit='D').tolist(),
+            'horizons': {
+                str(horizon): {
+                    'actual_prices': Y_test[:, j].tolist(),
+                    'predicted_prices': Y_pred[:, j].tolist(),
+                    'rmse': float(rmse[j]),
+                    'mape': float(mape[j]),
+                    'r2': float(r2[j]),
+                }
+                for j, horizon in enumerate(horizons)
+            },
+        }
+    return model, result
+
+def fit_stock_model(prices, company_name, verbose=True, features=None):
+    """
+    Runs the feature / fit / evaluate pipeline on date-sorted price columns.
+    Returns (model, result); result is {} when the data is unusable.
+    verbose=False skips the logged model report (used by the parallel runner).
+    features: precomputed feature matrix, see feature_matrix.
+    """
+    import pandas as pd
+
+    # 2-5. Features (X) and next-day Target (y), see feature_matrix
+    with span('features'):
+        dates, X, y = feature_matrix(prices, features=features)
 
     #  6. Chronological Data Split (80% Train, 20% Test), (80% is used to train and the remaining 20% is used to test the data)
-    split_percentage = 0.8
-    split_index = int(len(df) * split_percentage)
+    split_index = int(len(y) * split_percentage)
 
     X_train = X[:split_index]
     y_train = y[:split_index]
@@ -56,42 +262,38 @@ def analyze_stock(csv_filename, company_name):
     y_test = y[split_index:]
 
     if len(X_test) == 0:
-        print(f"Error: Not enough data for {company_name} to create a test set. Need more data.")
-        return {}
+        logger.error("Not enough data for %s to create a test set. Need more data.", company_name)
+        return None, {}
 
-    #  7. Train the Model ---
-    model = LinearRegression()
-    model.fit(X_train, y_train)
+    #  7. Train the Model (OLS from X'X / X'y, see core.regression) ---
+    with span('fit'):
+        model = IncrementalOLS()
+        model.fit(X_train, y_train)
 
     # 8. Analyze the Model's Formula ---
     intercept = model.intercept_ #intercept of the formula
     coefficients = model.coef_
-    coeff_df = pd.DataFrame(coefficients, index=features_list, columns=['Coefficient']) #coefficients i.e; m values 
     
-    print(f"\n--- Model Results for {company_name} ---")
-    print(f"The intercept (b) is: {intercept:.4f}")
-    print("\nModel Coefficients (Formula):")
-    print(coeff_df)
+    if verbose and logger.isEnabledFor(logging.INFO):
+        coeff_df = pd.DataFrame(coefficients, index=features_list, columns=['Coefficient']) #coefficients i.e; m values 
+        logger.info("\n--- Model Results for %s ---\nThe intercept (b) is: %.4f\n\nModel Coefficients (Formula):\n%s",
+                    company_name, intercept, coeff_df)
 
     # 9. Evaluate the Model ---
-    y_pred = model.predict(X_test)
-    
-    mse = mean_squared_error(y_test, y_pred) 
-    rmse = np.sqrt(mse) #absolute error in dollors
-    r2 = r2_score(y_test, y_pred) 
-    mape = mean_absolute_percentage_error(y_test, y_pred) 
+    with span('metrics'):
+        y_pred = model.predict(X_test)
+        rmse, mape, r2 = regression_metrics(y_test, y_pred) #rmse is the absolute error in dollors
 
-    print("\nModel Performance on Test Set:")
-    print(f"Test RMSE (Average $ Error): ${rmse:.2f}")
-    print(f"Test MAPE (Average % Error): {mape:.2%}") 
-    print(f"Test R-squared (Model Fit): {r2:.4f}")
+    if verbose:
+        log_performance(rmse, mape, r2)
 
     # 10. Return data for visualization instead of plotting
-    dates = [date.strftime('%Y-%m-%d') for date in y_test.index]
-    actual_prices = y_test.values.tolist()
-    predicted_prices = y_pred.tolist()
+    with span('serialize'):
+        dates = np.datetime_as_string(dates[split_index:].astype('datetime64[ns]'), unit='D').tolist()
+        actual_prices = y_test.tolist()
+        predicted_prices = y_pred.tolist()
     
-    return {
+    return model, {
         'company': company_name,
         'dates': dates,
         'actual_prices': actual_prices,
@@ -100,6 +302,50 @@ def analyze_stock(csv_filename, company_name):
         'mape': float(mape),
         'r2': float(r2)
     }
+
+def log_performance(rmse, mape, r2):
+    logger.info("\nModel Performance on Test Set:\nTest RMSE (Average $ Error): $%.2f\n"
+                "Test MAPE (Average %% Error): %.2f%%\nTest R-squared (Model Fit): %.4f",
+                rmse, mape * 100, r2)
+
+def stream_stock_model(file_path, company_name, start=None, end=None, verbose=True, chunk_bytes=CHUNK_BYTES):
+    """
+    fit_stock_model for a price file read in chunks (see core.streaming), so
+    memory stays bounded for files far larger than RAM. The file must be in
+    date order. Returns (model, result, last TAIL_BARS bars); result matches
+    the in-memory path to rounding.
+    """
+    with span('stream'):
+        model, dates, y_test, y_pred, last_bars = stream_fit(
+            file_path, FEATURE_PLAN, split_percentage, start, end, chunk_bytes, keep_bars=TAIL_BARS,
+        )
+    if model is None:
+        logger.error("Not enough data for %s to create a test set. Need more data.", company_name)
+        return None, {}, None
+
+    if verbose:
+        logger.info("\n--- Model Results for %s ---\nThe intercept (b) is: %.4f\n\nModel Coefficients (Formula):\n%s",
+                    company_name, model.intercept_,
+                    '\n'.join(f'{name:<8}{value: .6e}' for name, value in zip(features_list, model.coef_)))
+
+    with span('metrics'):
+        rmse, mape, r2 = regression_metrics(y_test, y_pred)
+
+    if verbose:
+        log_performance(rmse, mape, r2)
+
+    with span('serialize'):
+        result = {
+            'company': company_name,
+            'dates': np.datetime_as_string(dates.astype('datetime64[ns]'), unit='D').tolist(),
+            'actual_prices': y_test.tolist(),
+            'predicted_prices': y_pred.tolist(),
+            'rmse': float(rmse),
+            'mape': float(mape),
+            'r2': float(r2)
+        }
+    return model, result, last_bars
+
 def main_menu():
     """
     This function runs the main user menu.
@@ -142,5 +388,44 @@ def main_menu():
         else:
             print("Invalid choice. Please enter 1, 2, 3, 4, 5, 6 or q.")
 
+def main(argv=None):
+    """
+    Command line entry point: the interactive menu by default, or a parallel
+    run over every ticker with --all (python -m core.main_model --all --workers 8).
+    """
+    import argparse
+    from .parallel import analyze_all
+    from .tickers import TICKERS
+
+    parser = argparse.ArgumentParser(description='Stock prediction model')
+    parser.add_argument('--all', action='store_true', help='Analyze every ticker in a process pool')
+    parser.add_argument('--symbols', help='Comma-separated subset of tickers for --all')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=1, help='Tickers handed to a worker per task')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not args.all:
+        main_menu()
+        return
+
+    tickers = TICKERS
+    if args.symbols:
+        wanted = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+        unknown = [s for s in wanted if s not in TICKERS]
+        if unknown:
+            parser.error(f"Unknown symbols: {', '.join(unknown)}")
+        tickers = {s: TICKERS[s] for s in wanted}
+
+    timings, wall = analyze_all(tickers, workers=args.workers, chunksize=args.chunksize)
+    print(f"{'Symbol':<8}{'Time':>10}{'RMSE':>12}{'MAPE':>10}{'R2':>10}")
+    for symbol, (result, seconds) in timings.items():
+        if not result:
+            print(f"{symbol:<8}{seconds * 1000:>8.1f}ms  not enough data")
+            continue
+        print(f"{symbol:<8}{seconds * 1000:>8.1f}ms{result['rmse']:>12.2f}{result['mape']:>10.2%}{result['r2']:>10.4f}")
+    busy = sum(seconds for _, seconds in timings.values())
+    print(f"\n{len(timings)} tickers in {wall:.2f}s wall time ({busy:.2f}s of analysis across workers)")
+
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+
+# Suite -> (benchmark, columns identifying a row when comparing with the baseline)
+SUITES = {
+    'regression': (benchmarks.bench_regression, ('symbol',)),
+    'backtest': (benchmarks.bench_backtest, ('symbol', 'mode')),
+    'features': (benchmarks.bench_features, ('features',)),
+    'pipeline': (benchmarks.bench_pipeline, ('rows', 'tickers')),
+    'layout': (benchmarks.bench_layout, ('rows', 'layout')),
+    'endpoints': (benchmarks.bench_endpoints, ('endpoint',)),
+    'imports': (benchmarks.bench_imports, ('entry',)),
+    'serialization': (benchmarks.bench_serialization, ('symbol', 'format')),
+}
+
+
+class Command(BaseCommand):
+    help = 'Run the prediction pipeline benchmarks and print one table per suite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help=f"Suites to run: {', '.join(SUITES)} (default: all)")
+        parser.add_argument('--repeat', type=int, default=5, help='Timing repeats; the best run is reported')
+        parser.add_argument(
+            '--rows', default=','.join(map(str, benchmarks.PIPELINE_ROWS)),
+            help='Comma-separated synthetic series lengths for the pipeline and layout suites',
+        )
+        parser.add_argument('--tickers', type=int, default=1, help='Synthetic series per length for the pipeline suite')
+        parser.add_argument('--baseline', default=benchmarks.BASELINE_PATH, help='Baseline results file')
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline for its suites')
+        parser.add_argument('--compare', action='store_true', help='Fail on regressions against the baseline')
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed slowdown (or memory growth) against the baseline, as a fraction',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['suites']) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suite(s): {', '.join(sorted(unknown))}")
+        try:
+            sizes = [int(rows.replace('_', '')) for rows in options['rows'].split(',') if rows.strip()]
+        except ValueError:
+            raise CommandError(f"--rows must be comma-separated integers, got '{options['rows']}'")
+        suite_options = {'pipeline': {'sizes': sizes, 'tickers': options['tickers']}, 'layout': {'sizes': sizes}}
+        baseline = benchmarks.load_baseline(options['baseline']) if options['compare'] else {}
+        missing = [name for name in options['suites'] or SUITES if options['compare'] and name not in baseline]
+        if missing:
+            raise CommandError(
+                f"No baseline for {', '.join(missing)} in {options['baseline']}; "
+                'record one with --save-baseline first'
+            )
+
+        failed = []
+        ran = {}
+        for name in options['suites'] or SUITES:
+            bench, key = SUITES[name]
+            rows = ran[name] = bench(repeat=options['repeat'], **suite_options.get(name, {}))
+            if options['compare']:
+                rows = benchmarks.compare_to_baseline(rows, baseline.get(name, []), key, options['threshold'])
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.print_table(rows)
+            # Suites that guard a budget, and baseline comparisons, mark offending rows with status 'over'
+            if any(row.get('status') == 'over' for row in rows):
+                failed.append(name)
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(ran, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"\nBaseline saved to {options['baseline']}"))
+        if failed:
+            raise CommandError(f"Over budget or regressed: {', '.join(failed)}")
+
+    def print_table(self, rows):
+        if not rows:
+            return
+        columns = list(rows[0])
+        cells = [[self.format_cell(row[c]) for c in columns] for row in rows]
+        widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+        self.stdout.write('  '.join(c.rjust(w) for c, w in zip(columns, widths)))
+        for r in cells:
+            self.stdout.write('  '.join(v.rjust(w) for v, w in zip(r, widths)))
+
+    @staticmethod
+    def format_cell(value):
+        if isinstance(value, float):
+            return f'{value:.3g}' if abs(value) < 1e-3 or abs(value) >= 1e5 else f'{value:.3f}'
+        return str(value)
@@ -0,0 +1,40 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.main_model import FEATURE_CONFIG, MODEL_VERSION, fit_stock_model, script_dir
+from core.model_artifacts import load_model_artifact, save_model_artifact
+from core.price_store import load_prices
+from core.tickers import TICKERS
+
+
+class Command(BaseCommand):
+    help = 'Fit every ticker and persist the models that workers preload at startup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Tickers to build (default: all known tickers)')
+        parser.add_argument('--force', action='store_true', help='Rebuild artifacts that are already fresh')
+
+    def handle(self, *args, **options):
+        symbols = [s.upper() for s in options['symbols']] or list(TICKERS)
+        unknown = [s for s in symbols if s not in TICKERS]
+        if unknown:
+            raise CommandError(f"Unknown symbols: {', '.join(unknown)}")
+
+        for symbol in symbols:
+            csv_filename, company_name = TICKERS[symbol]
+            path = os.path.join(script_dir, csv_filename)
+            if not options['force'] and load_model_artifact(path, MODEL_VERSION, FEATURE_CONFIG) is not None:
+                self.stdout.write(f'{symbol}: up to date')
+                continue
+
+            start = time.perf_counter()
+            prices = load_prices(path)
+            model, result = fit_stock_model(prices, company_name, verbose=False)
+            if not result:
+                self.stderr.write(f'{symbol}: not enough data')
+                continue
+            save_model_artifact(path, model, result, prices, MODEL_VERSION, FEATURE_CONFIG)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'{symbol}: fitted and saved in {elapsed * 1000:.1f} ms'))
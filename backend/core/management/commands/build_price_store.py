@@ -0,0 +1,38 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.price_store import STORE_DIR, build_artifact, load_artifact, script_dir, source_files
+
+
+class Command(BaseCommand):
+    help = 'Convert the CSV/XLS price files into the memory-mappable binary price store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Source files (default: every price file in --data-dir)')
+        parser.add_argument('--data-dir', default=script_dir, help='Directory holding the source files')
+        parser.add_argument('--store-dir', default=STORE_DIR, help='Where to write the binary artifacts')
+        parser.add_argument('--force', action='store_true', help='Rebuild artifacts that are already fresh')
+        parser.add_argument(
+            '--chunk-mb', type=int, default=0,
+            help='Stream each (date-sorted) CSV in chunks of this many MB instead of loading it whole',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['files'] or source_files(options['data_dir'])
+        if not paths:
+            raise CommandError(f"No price files found in {options['data_dir']}")
+
+        for path in paths:
+            if not os.path.exists(path):
+                raise CommandError(f'{path} does not exist')
+            name = os.path.basename(path)
+            if not options['force'] and load_artifact(path, options['store_dir']) is not None:
+                self.stdout.write(f'{name}: up to date')
+                continue
+
+            start = time.perf_counter()
+            meta = build_artifact(path, options['store_dir'], options['chunk_mb'] * 1024 * 1024)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f"{name}: {meta['rows']} rows in {elapsed * 1000:.1f} ms"))
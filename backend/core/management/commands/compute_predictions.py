@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.batch import batch_predict
+from core.main_model import MODEL_VERSION
+from core.models import Prediction
+from core.tickers import TICKERS
+
+
+class Command(BaseCommand):
+    help = 'Run the model for every ticker and store the next-day forecasts served by /api/predictions/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Tickers to refresh (default: all known tickers)')
+
+    def handle(self, *args, **options):
+        symbols = [s.upper() for s in options['symbols']] or list(TICKERS)
+
+        start = time.perf_counter()
+        results, errors = batch_predict(symbols)
+        for symbol, message in errors.items():
+            self.stderr.write(f'{symbol}: {message}')
+        results = [r for r in results if r['next_price'] is not None]
+        if not results:
+            raise CommandError('No predictions could be computed')
+
+        with transaction.atomic():
+            Prediction.objects.filter(symbol__in=[r['symbol'] for r in results], is_latest=True).update(is_latest=False)
+            for r in results:
+                Prediction.objects.update_or_create(
+                    symbol=r['symbol'],
+                    as_of=r['as_of'],
+                    defaults={
+                        'name': r['company'],
+                        'current_price': r['last_price'],
+                        'next_price': r['next_price'],
+                        'change_percent': (r['next_price'] - r['last_price']) / r['last_price'] * 100,
+                        'rmse': r['rmse'],
+                        'mape': r['mape'],
+                        'r2': r['r2'],
+                        'model_version': MODEL_VERSION,
+                        'is_latest': True,
+                    },
+                )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Stored {len(results)} predictions ({MODEL_VERSION}) in {elapsed:.2f}s'))
@@ -0,0 +1,64 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.grid_search import DEFAULT_GRID, RESULTS_PATH, run_grid_search, write_table
+from core.tickers import TICKERS
+
+
+class Command(BaseCommand):
+    help = 'Evaluate feature sets, windows and train splits on every ticker and rank them by MAPE (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Tickers to evaluate (default: all known tickers)')
+        parser.add_argument(
+            '--grid',
+            help='JSON file with "feature_sets" ({name: [feature, ...]}, "{window}" templates allowed), '
+                 '"windows" and "splits" (default: the built-in grid)',
+        )
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--results', default=RESULTS_PATH, help='JSON-lines file of per-ticker results, appended as they finish')
+        parser.add_argument('--table', help='Ranked CSV table (default: next to --results)')
+        parser.add_argument('--top', type=int, default=10, help='Ranked configurations to print')
+        parser.add_argument('--restart', action='store_true', help='Discard earlier results instead of resuming')
+
+    def handle(self, *args, **options):
+        symbols = [s.upper() for s in options['symbols']] or list(TICKERS)
+        unknown = [s for s in symbols if s not in TICKERS]
+        if unknown:
+            raise CommandError(f"Unknown symbols: {', '.join(unknown)}")
+
+        grid = DEFAULT_GRID
+        if options['grid']:
+            try:
+                with open(options['grid']) as f:
+                    grid = {**DEFAULT_GRID, **json.load(f)}
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f"Could not read grid file: {e}")
+
+        results_path = options['results']
+        if options['restart'] and os.path.exists(results_path):
+            os.remove(results_path)
+
+        def progress(records, seconds):
+            self.stdout.write(f"{records[0]['symbol']}: {len(records)} configurations in {seconds * 1000:.0f} ms")
+
+        try:
+            rows, evaluated, wall = run_grid_search(
+                grid, {s: TICKERS[s] for s in symbols}, results_path, options['workers'], progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        table = options['table'] or os.path.splitext(results_path)[0] + '.csv'
+        write_table(rows, table)
+        self.stdout.write(self.style.SUCCESS(
+            f'{evaluated} evaluations in {wall:.2f}s; {len(rows)} configurations ranked in {table}'
+        ))
+        self.stdout.write(f"{'Rank':>4}  {'Configuration':<30}{'Tickers':>8}{'MAPE':>9}{'Worst':>9}{'R2':>9}")
+        for rank, row in enumerate(rows[:options['top']], 1):
+            self.stdout.write(
+                f"{rank:>4}  {row['config']:<30}{row['tickers']:>8}{row['mean_mape']:>9.2%}"
+                f"{row['worst_mape']:>9.2%}{row['mean_r2']:>9.4f}"
+            )
@@ -0,0 +1,130 @@
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Stock
+from core.price_store import load_prices, script_dir, source_files
+from core.tickers import symbol_for_file
+
+# Stock column -> price store column
+FIELDS = {
+    'open_price': 'open',
+    'high_price': 'high',
+    'low_price': 'low',
+    'close_price': 'close',
+    'volume': 'volume',
+}
+
+COPY_SQL = '''
+CREATE TEMP TABLE stock_ingest (
+    symbol varchar(10), date date, open_price double precision, high_price double precision,
+    low_price double precision, close_price double precision, volume bigint
+) ON COMMIT DROP
+'''
+
+UPSERT_SQL = '''
+INSERT INTO {table} (symbol, date, open_price, high_price, low_price, close_price, volume, updated_at)
+SELECT symbol, date, open_price, high_price, low_price, close_price, volume, now() FROM stock_ingest
+ON CONFLICT (symbol, date) DO UPDATE SET
+    open_price = EXCLUDED.open_price, high_price = EXCLUDED.high_price,
+    low_price = EXCLUDED.low_price, close_price = EXCLUDED.close_price, volume = EXCLUDED.volume,
+    updated_at = EXCLUDED.updated_at
+'''
+
+
+def price_frame(path):
+    """
+    The rows of one price file as a DataFrame shaped like the Stock table,
+    with incomplete and duplicate-date rows dropped.
+    """
+    prices = load_prices(path)
+    frame = pd.DataFrame({field: prices[column] for field, column in FIELDS.items()})
+    frame.insert(0, 'date', prices['date'].view('datetime64[ns]').astype('datetime64[D]'))
+    frame.insert(0, 'symbol', symbol_for_file(path))
+    frame = frame.dropna().drop_duplicates(['symbol', 'date'], keep='last')
+    frame['volume'] = frame['volume'].astype(np.int64)
+    return frame
+
+
+class Command(BaseCommand):
+    help = 'Upsert the ticker price files into core.Stock on (symbol, date)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Price files (default: every price file in --data-dir)')
+        parser.add_argument('--data-dir', default=script_dir, help='Directory to scan for price files')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT / COPY batch')
+        parser.add_argument(
+            '--method', choices=['auto', 'bulk', 'copy'], default='auto',
+            help='copy uses PostgreSQL COPY, bulk uses bulk_create; auto picks copy on PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['files'] or source_files(options['data_dir'])
+        if not paths:
+            raise CommandError(f"No price files found in {options['data_dir']}")
+
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('--method copy needs a PostgreSQL database')
+
+        total_rows = 0
+        total_start = time.perf_counter()
+        for path in paths:
+            frame = price_frame(path)
+            symbol = frame['symbol'].iat[0] if len(frame) else symbol_for_file(path)
+            if len(symbol) > Stock._meta.get_field('symbol').max_length:
+                raise CommandError(f'Symbol {symbol} from {path} is too long')
+
+            start = time.perf_counter()
+            with transaction.atomic():
+                if method == 'copy':
+                    self.copy_rows(frame, options['batch_size'])
+                else:
+                    self.bulk_rows(frame, options['batch_size'])
+            elapsed = time.perf_counter() - start
+
+            total_rows += len(frame)
+            self.stdout.write(
+                f'{os.path.basename(path)} -> {symbol}: {len(frame)} rows in {elapsed:.2f}s '
+                f'({len(frame) / max(elapsed, 1e-9):,.0f} rows/s)'
+            )
+
+        elapsed = time.perf_counter() - total_start
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingested {total_rows} rows from {len(paths)} files via {method} in {elapsed:.2f}s '
+            f'({total_rows / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
+
+    def bulk_rows(self, frame, batch_size):
+        update_fields = list(FIELDS)
+        columns = ['symbol', 'date', *update_fields]
+        for start in range(0, len(frame), batch_size):
+            batch = frame.iloc[start:start + batch_size]
+            objs = [
+                Stock(**dict(zip(columns, row)))
+                for row in zip(batch['symbol'], batch['date'].dt.date, *(batch[f].tolist() for f in update_fields))
+            ]
+            Stock.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['symbol', 'date'],
+                # updated_at is set by auto_now on every object, so corrected rows change db_fingerprint
+                update_fields=[*update_fields, 'updated_at'],
+            )
+
+    def copy_rows(self, frame, batch_size):
+        with connection.cursor() as cursor:
+            cursor.execute(COPY_SQL)
+            for start in range(0, len(frame), batch_size):
+                buffer = io.StringIO()
+                frame.iloc[start:start + batch_size].to_csv(buffer, header=False, index=False)
+                buffer.seek(0)
+                cursor.copy_expert('COPY stock_ingest FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute(UPSERT_SQL.format(table=connection.ops.quote_name(Stock._meta.db_table)))
@@ -0,0 +1,28 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.incremental import STATE_DIR, refresh_features
+from core.price_store import STORE_DIR, script_dir, source_files
+
+
+class Command(BaseCommand):
+    help = 'Append newly arrived bars to the price store, rolling-feature state and feature matrix of each ticker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Price files (default: every price file in --data-dir)')
+        parser.add_argument('--data-dir', default=script_dir, help='Directory to scan for price files')
+        parser.add_argument('--state-dir', default=STATE_DIR, help='Where the rolling-window state and feature matrices are kept')
+        parser.add_argument('--store-dir', default=STORE_DIR, help='Price store the new bars are appended to')
+
+    def handle(self, *args, **options):
+        paths = options['files'] or source_files(options['data_dir'])
+        if not paths:
+            raise CommandError(f"No price files found in {options['data_dir']}")
+
+        for path in paths:
+            start = time.perf_counter()
+            rows = refresh_features(path, options['state_dir'], options['store_dir'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{os.path.basename(path)}: {len(rows)} new bars in {elapsed * 1000:.1f} ms')
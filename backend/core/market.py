@@ -0,0 +1,222 @@
+import threading
+import time
+
+import numpy as np
+
+from .model_cache import file_fingerprint
+from .price_store import load_prices, source_files
+from .tickers import TICKERS, symbol_for_file
+
+# Bars behind the average volume and the volatility of each snapshot row
+LOOKBACK = 20
+TRADING_DAYS = 252
+
+# Rows returned by a movers or screener request at most
+MAX_RESULTS = 500
+
+# How often the source files are re-checked for changes, in seconds
+SNAPSHOT_RECHECK_SECONDS = 5
+
+# Query value -> snapshot column, for sorting screener results
+SORT_COLUMNS = {
+    'change': 'change_pct',
+    'volume': 'volume',
+    'volatility': 'volatility',
+    'price': 'price',
+}
+
+# Mover type -> (sort column, largest first, row filter)
+MOVERS = {
+    'gainers': ('change_pct', True, lambda s: s.change_pct > 0),
+    'losers': ('change_pct', False, lambda s: s.change_pct < 0),
+    'active': ('volume', True, None),
+    'volatile': ('volatility', True, None),
+}
+
+# Screener query parameter -> (snapshot column, bound)
+SCREEN_FILTERS = {
+    'min_change': ('change_pct', 'min'),
+    'max_change': ('change_pct', 'max'),
+    'min_volume': ('volume', 'min'),
+    'max_volume': ('volume', 'max'),
+    'min_volatility': ('volatility', 'min'),
+    'max_volatility': ('volatility', 'max'),
+    'min_price': ('price', 'min'),
+    'max_price': ('price', 'max'),
+}
+
+
+def top_k(values, k, largest=True):
+    """
+    Indices of the k largest (or smallest) values in order, by argpartition:
+    O(n + k log k) instead of a full sort. NaNs come last.
+    """
+    n = len(values)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keys = -values if largest else values
+    idx = np.argpartition(keys, k - 1)[:k] if k < n else np.arange(n)
+    return idx[np.argsort(keys[idx], kind='stable')]
+
+
+def latest_bars(prices, lookback=LOOKBACK):
+    """
+    Snapshot fields of one symbol from its last lookback + 1 bars, or None
+    with fewer than two bars.
+    """
+    close = np.asarray(prices['close'][-(lookback + 1):], dtype=np.float64)
+    if len(close) < 2:
+        return None
+    returns = np.diff(np.log(close))
+    volume = np.asarray(prices['volume'][-lookback:], dtype=np.float64)
+    traded = volume[np.isfinite(volume)]
+    return {
+        'date': np.datetime64(int(prices['date'][-1]), 'ns').astype('datetime64[D]'),
+        'price': close[-1],
+        'prev_close': close[-2],
+        # Missing volumes (blank cells in the source) count as no trading
+        'volume': int(volume[-1]) if np.isfinite(volume[-1]) else 0,
+        'avg_volume': float(traded.mean()) if len(traded) else 0.0,
+        # Annualised, in percent; NaN until there are two returns
+        'volatility': float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS) * 100) if len(returns) > 1 else np.nan,
+    }
+
+
+class MarketSnapshot:
+    """
+    Latest bar of every symbol in the price store as column arrays, so movers,
+    screens and quotes are vectorised selections rather than per-request scans.
+    """
+
+    def __init__(self, symbols, names, bars, fingerprint=None):
+        self.symbols = np.array(symbols, dtype=object)
+        self.names = np.array(names, dtype=object)
+        self.fingerprint = fingerprint
+        self.date = np.array([bar['date'] for bar in bars], dtype='datetime64[D]')
+        self.price = np.array([bar['price'] for bar in bars], dtype=np.float64)
+        self.prev_close = np.array([bar['prev_close'] for bar in bars], dtype=np.float64)
+        self.volume = np.array([bar['volume'] for bar in bars], dtype=np.int64)
+        self.avg_volume = np.array([bar['avg_volume'] for bar in bars], dtype=np.float64)
+        self.volatility = np.array([bar['volatility'] for bar in bars], dtype=np.float64)
+        self.change = self.price - self.prev_close
+        self.change_pct = self.change / self.prev_close * 100
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def rows(self, idx=None):
+        """
+        API rows for the given row indices (default: all, in symbol order).
+        """
+        idx = np.arange(len(self)) if idx is None else np.asarray(idx, dtype=np.intp)
+        columns = zip(
+            self.symbols[idx], self.names[idx], np.datetime_as_string(self.date[idx]).tolist(),
+            self.price[idx].round(4).tolist(), self.change[idx].round(4).tolist(),
+            self.change_pct[idx].round(4).tolist(), self.volume[idx].tolist(),
+            self.avg_volume[idx].round(0).tolist(), self.volatility[idx].round(4).tolist(),
+        )
+        return [
+            {
+                'symbol': symbol, 'name': name, 'date': date, 'price': price, 'change': change,
+                'changePercent': change_pct, 'volume': volume, 'avgVolume': avg_volume,
+                'volatility': None if np.isnan(volatility) else volatility,
+            }
+            for symbol, name, date, price, change, change_pct, volume, avg_volume, volatility in columns
+        ]
+
+    def select(self, sort, largest=True, limit=None, mask=None):
+        """
+        Row indices ordered by column `sort`, restricted to `mask`, top `limit` only.
+        """
+        idx = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        values = getattr(self, sort)[idx].astype(np.float64)
+        return idx[top_k(values, len(idx) if limit is None else limit, largest)]
+
+    def movers(self, kind, limit):
+        sort, largest, row_filter = MOVERS[kind]
+        return self.rows(self.select(sort, largest, limit, row_filter(self) if row_filter else None))
+
+    def screen(self, filters, sort='change', largest=True, limit=None):
+        """
+        Rows within every {SCREEN_FILTERS name: bound}, ordered by SORT_COLUMNS[sort].
+        NaN volatility fails any volatility bound.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, bound in filters.items():
+            column, side = SCREEN_FILTERS[name]
+            values = getattr(self, column)
+            mask &= values >= bound if side == 'min' else values <= bound
+        idx = self.select(SORT_COLUMNS[sort], largest, limit, mask)
+        return self.rows(idx), int(mask.sum())
+
+    def quotes(self, symbols):
+        """
+        (rows for the known symbols in request order, unknown symbols).
+        """
+        found = [self.index[s] for s in symbols if s in self.index]
+        return self.rows(found), [s for s in symbols if s not in self.index]
+
+    def composite(self):
+        """
+        Price-weighted average of every symbol's last bar (a Dow-style index with
+        divisor N) and the market breadth behind it.
+        """
+        if not len(self):
+            return None
+        value = float(self.price.mean())
+        change = float(self.change.mean())
+        return {
+            'symbol': 'DEVSTOCK',
+            'name': f'DevStock Composite ({len(self)} stocks)',
+            'value': round(value, 4),
+            'change': round(change, 4),
+            'changePercent': round(change / float(self.prev_close.mean()) * 100, 4),
+            'advancers': int((self.change > 0).sum()),
+            'decliners': int((self.change < 0).sum()),
+            'unchanged': int((self.change == 0).sum()),
+            'asOf': str(self.date.max()),
+        }
+
+
+def build_snapshot(paths=None):
+    """
+    Snapshot of every price file (default: all source files), from the price store.
+    """
+    paths = source_files() if paths is None else paths
+    symbols, names, bars = [], [], []
+    fingerprint = []
+    for path in paths:
+        fingerprint.append(file_fingerprint(path))
+        bar = latest_bars(load_prices(path))
+        if bar is None:
+            continue
+        symbol = symbol_for_file(path)
+        symbols.append(symbol)
+        names.append(TICKERS.get(symbol, (None, symbol))[1])
+        bars.append(bar)
+    return MarketSnapshot(symbols, names, bars, tuple(fingerprint))
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def market_snapshot():
+    """
+    This process's snapshot, rebuilt when a source file is added, removed or
+    changed. Files are re-checked at most every SNAPSHOT_RECHECK_SECONDS.
+    """
+    global _snapshot, _checked_at
+    if _snapshot is not None and time.monotonic() - _checked_at < SNAPSHOT_RECHECK_SECONDS:
+        return _snapshot
+    with _lock:
+        if _snapshot is None or time.monotonic() - _checked_at >= SNAPSHOT_RECHECK_SECONDS:
+            paths = source_files()
+            fingerprint = tuple(file_fingerprint(path) for path in paths)
+            if _snapshot is None or fingerprint != _snapshot.fingerprint:
+                _snapshot = build_snapshot(paths)
+            _checked_at = time.monotonic()
+    return _snapshot
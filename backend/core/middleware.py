@@ -0,0 +1,121 @@
+import cProfile
+import io
+import pstats
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .instrumentation import REQUEST_SECONDS, request_spans, server_timing, span
+
+# Lines of the cProfile report returned for ?profile=1
+PROFILE_LINES = 40
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI.
+
+    Stock WhiteNoiseMiddleware is sync-only, which makes Django push every
+    ASGI request through its single sync thread and serialises the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+def profile_view(view, request, args, kwargs):
+    """
+    Run a view under cProfile and return the report (top functions by
+    cumulative time) as a text/plain response in place of the view's own.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    finally:
+        profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    report = HttpResponse(out.getvalue(), content_type='text/plain; charset=utf-8')
+    report['X-Profiled-Status'] = str(response.status_code)
+    return report
+
+
+class TimingMiddleware:
+    """
+    Collect the spans of each request (core.instrumentation.span) into a
+    Server-Timing header and its latency into REQUEST_SECONDS. With
+    API_PROFILING on, ?profile=1 returns a cProfile report of the view instead.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = request_spans.set([])
+        start = time.perf_counter()
+        try:
+            return self._finish(request, self.get_response(request), start)
+        finally:
+            request_spans.reset(token)
+
+    async def __acall__(self, request):
+        token = request_spans.set([])
+        start = time.perf_counter()
+        try:
+            return self._finish(request, await self.get_response(request), start)
+        finally:
+            request_spans.reset(token)
+
+    def _finish(self, request, response, start):
+        total = time.perf_counter() - start
+        response['Server-Timing'] = server_timing(request_spans.get(), total)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUEST_SECONDS.observe(total, view, request.method, str(response.status_code))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not (settings.API_PROFILING and request.GET.get('profile') == '1'):
+            return None
+        if iscoroutinefunction(view_func) and hasattr(view_func, 'view_class'):
+            # Profile the sync view: the async one does its work on executor threads cProfile can't see
+            view_func = view_func.view_class.as_view()
+        return profile_view(view_func, request, view_args, view_kwargs)
+
+    def process_template_response(self, request, response):
+        # Render inside a span; Django's own render() call afterwards is then a no-op
+        with span('render'):
+            response.render()
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('open_price', models.FloatField()),
+                ('high_price', models.FloatField()),
+                ('low_price', models.FloatField()),
+                ('close_price', models.FloatField()),
+                ('volume', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stock',
+            constraint=models.UniqueConstraint(fields=('symbol', 'date'), name='stock_symbol_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('name', models.CharField(max_length=100)),
+                ('as_of', models.DateField()),
+                ('current_price', models.FloatField()),
+                ('next_price', models.FloatField()),
+                ('change_percent', models.FloatField()),
+                ('rmse', models.FloatField()),
+                ('mape', models.FloatField()),
+                ('r2', models.FloatField()),
+                ('model_version', models.CharField(max_length=20)),
+                ('is_latest', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['symbol', '-as_of'], name='prediction_symbol_as_of_idx'), models.Index(condition=models.Q(('is_latest', True)), fields=['-change_percent'], name='prediction_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='prediction',
+            constraint=models.UniqueConstraint(fields=('symbol', 'as_of'), name='prediction_symbol_as_of_uniq'),
+        ),
+    ]
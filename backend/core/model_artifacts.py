@@ -0,0 +1,89 @@
+import json
+import os
+
+import numpy as np
+
+from .model_cache import CachedModel, file_fingerprint
+from .price_store import STORE_DIR
+from .regression import IncrementalOLS
+
+MODEL_DIR = os.path.join(STORE_DIR, 'models')
+
+ARTIFACT_FORMAT = 1
+
+# Raw bars kept with each model: enough history to rebuild every feature window
+TAIL_BARS = 64
+
+PRICE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+
+def model_artifact_path(source_path, model_dir=None):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(model_dir or MODEL_DIR, f'{stem}.npz')
+
+
+def save_model_artifact(source_path, model, result, prices, model_version, feature_config, model_dir=None):
+    """
+    Persist a full-history fit of source_path: model statistics and coefficients,
+    the analyze_stock payload, and the last TAIL_BARS raw bars, tagged with the
+    source fingerprint and the model version / feature configuration it was built with.
+    """
+    _, mtime_ns, size = file_fingerprint(source_path)
+    meta = {
+        'format': ARTIFACT_FORMAT,
+        'model_version': model_version,
+        'feature_config': json.dumps(feature_config),
+        'source': os.path.basename(source_path),
+        'source_mtime_ns': mtime_ns,
+        'source_size': size,
+        'company': result['company'],
+        'rmse': result['rmse'],
+        'mape': result['mape'],
+        'r2': result['r2'],
+    }
+    arrays = {f'model_{name}': value for name, value in model.to_dict().items()}
+    arrays.update({f'tail_{name}': np.asarray(prices[name][-TAIL_BARS:]) for name in PRICE_COLUMNS})
+    arrays['dates'] = np.array(result['dates'], dtype='datetime64[D]')
+    arrays['actual_prices'] = np.array(result['actual_prices'], dtype=np.float64)
+    arrays['predicted_prices'] = np.array(result['predicted_prices'], dtype=np.float64)
+
+    path = model_artifact_path(source_path, model_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}.npz'
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return meta
+
+
+def load_model_artifact(source_path, model_version, feature_config, model_dir=None):
+    """
+    Load the persisted fit of source_path as (CachedModel, tail bars).
+    Returns None when there is no artifact, or it was built from a different
+    version of the file, model or features.
+    """
+    try:
+        _, mtime_ns, size = file_fingerprint(source_path)
+        with np.load(model_artifact_path(source_path, model_dir)) as data:
+            meta = json.loads(str(data['meta']))
+            if (meta.get('format') != ARTIFACT_FORMAT
+                    or meta['model_version'] != model_version
+                    or meta['feature_config'] != json.dumps(feature_config)
+                    or meta['source_mtime_ns'] != mtime_ns
+                    or meta['source_size'] != size):
+                return None
+            model = IncrementalOLS.from_dict({
+                name[len('model_'):]: data[name] for name in data.files if name.startswith('model_')
+            })
+            tail = {name: data[f'tail_{name}'] for name in PRICE_COLUMNS}
+            result = {
+                'company': meta['company'],
+                'dates': np.datetime_as_string(data['dates'], unit='D').tolist(),
+                'actual_prices': data['actual_prices'].tolist(),
+                'predicted_prices': data['predicted_prices'].tolist(),
+                'rmse': meta['rmse'],
+                'mape': meta['mape'],
+                'r2': meta['r2'],
+            }
+    except (FileNotFoundError, ValueError, KeyError, OSError):
+        return None
+    return CachedModel(model, result), tail
@@ -0,0 +1,70 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+# A fitted model together with the payload analyze_stock returned for it
+CachedModel = namedtuple('CachedModel', ['model', 'result'])
+
+
+def file_fingerprint(file_path):
+    """
+    Identify a data file by path, modification time and size.
+    Raises FileNotFoundError when the file does not exist.
+    """
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+class ModelCache:
+    """
+    Thread-safe LRU cache of fitted models.
+
+    Keys include the file fingerprint, so an edited data file is a miss and
+    its stale entry simply ages out of the LRU order.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# One cache per process (each gunicorn worker gets its own)
+model_cache = ModelCache(maxsize=int(os.environ.get('MODEL_CACHE_SIZE', 32)))
@@ -8,6 +8,46 @@ class Stock(models.Model):
     low_price = models.FloatField()
     close_price = models.FloatField()
     volume = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)  # Changes with every write, for db_fingerprint
+
+    class Meta:
+        constraints = [
+            # Also serves as the (symbol, date) index for per-symbol range scans
+            models.UniqueConstraint(fields=['symbol', 'date'], name='stock_symbol_date_uniq'),
+        ]
+        indexes = [
+            # Latest write per symbol, answered from the index
+            models.Index(fields=['symbol', 'updated_at'], name='stock_symbol_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} - {self.date}"
+
+class Prediction(models.Model):
+    symbol = models.CharField(max_length=10)
+    name = models.CharField(max_length=100)
+    as_of = models.DateField()  # date of the last bar the forecast is based on
+    current_price = models.FloatField()
+    next_price = models.FloatField()
+    change_percent = models.FloatField()
+    rmse = models.FloatField()
+    mape = models.FloatField()
+    r2 = models.FloatField()
+    model_version = models.CharField(max_length=20)
+    is_latest = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Last-Modified of the prediction endpoints
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'as_of'], name='prediction_symbol_as_of_uniq'),
+        ]
+        indexes = [
+            # Latest row per symbol
+            models.Index(fields=['symbol', '-as_of'], name='prediction_symbol_as_of_idx'),
+            # /api/predictions/top: already in change order, only current rows
+            models.Index(fields=['-change_percent'], name='prediction_top_idx', condition=models.Q(is_latest=True)),
+        ]
 
     def __str__(self):
-        return f"{self.symbol} - {self.date}"
\ No newline at end of file
+        return f"{self.symbol} - {self.as_of}"
@@ -0,0 +1,82 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .main_model import fit_stock_model, script_dir
+from .price_store import load_prices
+from .tickers import TICKERS
+
+
+def share_prices(prices):
+    """
+    Copy price columns into one shared memory block.
+    Returns the block (the caller unlinks it) and a picklable layout
+    [(column, dtype, offset, length)] for attach_prices.
+    """
+    size = sum(values.nbytes for values in prices.values())
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layout = []
+    offset = 0
+    for name, values in prices.items():
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf, offset=offset)
+        target[:] = values
+        layout.append((name, values.dtype.str, offset, len(values)))
+        offset += values.nbytes
+    return block, layout
+
+
+def attach_prices(block_name, layout):
+    """
+    Zero-copy views of the columns in a shared block. Drop the views before
+    closing the returned block.
+    """
+    block = shared_memory.SharedMemory(name=block_name)
+    prices = {
+        name: np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+        for name, dtype, offset, length in layout
+    }
+    return block, prices
+
+
+def _analyze_shared(task):
+    symbol, company_name, block_name, layout = task
+    start = time.perf_counter()
+    block, prices = attach_prices(block_name, layout)
+    try:
+        _, result = fit_stock_model(prices, company_name, verbose=False)
+    finally:
+        del prices
+        block.close()
+    return symbol, result, time.perf_counter() - start
+
+
+def analyze_all(tickers=None, workers=None, chunksize=1):
+    """
+    Run the analyze_stock pipeline for many tickers across a process pool.
+    Input columns reach the workers through shared memory rather than pickling.
+    Returns {symbol: (result, seconds)} and the total wall time.
+    """
+    tickers = TICKERS if tickers is None else tickers
+    wall_start = time.perf_counter()
+    blocks = []
+    tasks = []
+    try:
+        for symbol, (filename, company_name) in tickers.items():
+            prices = load_prices(os.path.join(script_dir, filename))
+            block, layout = share_prices(prices)
+            blocks.append(block)
+            tasks.append((symbol, company_name, block.name, layout))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            timings = {
+                symbol: (result, seconds)
+                for symbol, result, seconds in pool.map(_analyze_shared, tasks, chunksize=chunksize)
+            }
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return timings, time.perf_counter() - wall_start
@@ -0,0 +1,414 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .model_cache import file_fingerprint
+
+# Get the absolute path to the directory where this script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Where the binary artifacts live; one sub-directory per source file
+STORE_DIR = os.environ.get('PRICE_STORE_DIR', os.path.join(script_dir, '.pricestore'))
+
+# Source files are CSV text even when they carry an .xls extension
+SOURCE_EXTENSIONS = ('.csv', '.xls')
+
+# Column name in the store -> column name in the source files
+COLUMNS = {
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume',
+}
+
+STORE_FORMAT = 1
+
+# Source bytes parsed at a time by read_chunks
+CHUNK_BYTES = 64 * 2**20
+
+# Bytes at the end of a source file checksummed in meta.json, so append_artifact
+# can tell bars appended to the file from a file rewritten to the same or a larger size
+TAIL_BYTES = 4096
+
+DAY_NS = 86_400 * 10**9
+
+# Price store column -> core.Stock field, and the row layout of a values_list read
+DB_FIELDS = {
+    'open': 'open_price',
+    'high': 'high_price',
+    'low': 'low_price',
+    'close': 'close_price',
+    'volume': 'volume',
+}
+DB_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'float64'),
+    ('high', 'float64'),
+    ('low', 'float64'),
+    ('close', 'float64'),
+    ('volume', 'int64'),
+])
+
+
+def source_files(data_dir=script_dir):
+    """
+    All price files in data_dir, sorted by name.
+    """
+    paths = []
+    for ext in SOURCE_EXTENSIONS:
+        paths.extend(glob.glob(os.path.join(data_dir, '*' + ext)))
+    return sorted(paths)
+
+
+def artifact_dir(source_path, store_dir=None):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(store_dir or STORE_DIR, stem)
+
+
+def read_source(source_path):
+    """
+    Parse a source file into date-sorted column arrays.
+    'date' is int64 nanoseconds since the epoch (UTC, tz-naive).
+    """
+    # Only needed when (re)building the store; keeps pandas out of the serving path
+    import pandas as pd
+
+    prices = _frame_columns(pd.read_csv(source_path, usecols=['Date', *COLUMNS.values()]))
+    order = np.argsort(prices['date'], kind='stable')
+    return {name: values[order] for name, values in prices.items()}
+
+
+def _frame_columns(df):
+    import pandas as pd
+
+    dates = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
+    prices = {'date': dates.values.astype('datetime64[ns]').view('int64')}
+    for name, column in COLUMNS.items():
+        prices[name] = df[column].to_numpy()
+    return prices
+
+
+def read_chunks(source_path, chunk_bytes=CHUNK_BYTES, offset=None):
+    """
+    Parse a source file about chunk_bytes of whole lines at a time, in file
+    order (unsorted). Yields (byte offset of the chunk, price columns as in
+    read_source); passing an offset back resumes reading at that chunk.
+    """
+    import pandas as pd
+
+    with open(source_path, 'rb') as f:
+        header = f.readline()
+        if offset is not None:
+            f.seek(offset)
+        position = f.tell()
+        carry = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if block:
+                block = carry + block
+                end = block.rfind(b'\n') + 1
+                lines, carry = block[:end], block[end:]
+            else:
+                lines, carry = carry, b''
+            if lines.strip():
+                df = pd.read_csv(io.BytesIO(header + lines), usecols=['Date', *COLUMNS.values()])
+                yield position, _frame_columns(df)
+            position += len(lines)
+            if not block:
+                return
+
+
+def build_artifact(source_path, store_dir=None, chunk_bytes=None):
+    """
+    Convert one source file into a directory of .npy columns plus meta.json.
+    The new directory is swapped in by rename so readers never see a half write.
+    With chunk_bytes the file is streamed through read_chunks so memory stays
+    bounded by the chunk size; it must then already be in date order.
+    """
+    target = artifact_dir(source_path, store_dir)
+    tmp = f'{target}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    if chunk_bytes:
+        rows, dtypes = _write_chunked(source_path, tmp, chunk_bytes)
+    else:
+        prices = read_source(source_path)
+        for name, values in prices.items():
+            np.save(os.path.join(tmp, f'{name}.npy'), np.ascontiguousarray(values))
+        rows = len(prices['date'])
+        dtypes = {name: values.dtype for name, values in prices.items()}
+
+    _, mtime_ns, size = file_fingerprint(source_path)
+    meta = {
+        'format': STORE_FORMAT,
+        'source': os.path.basename(source_path),
+        'source_mtime_ns': mtime_ns,
+        'source_size': size,
+        'source_tail': _source_tail(source_path, size),
+        'rows': int(rows),
+        'columns': {name: str(dtype) for name, dtype in dtypes.items()},
+    }
+    _write_meta(tmp, meta)
+
+    old = f'{target}.old-{os.getpid()}'
+    if os.path.isdir(target):
+        os.rename(target, old)
+    os.rename(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+def _source_tail(source_path, size):
+    with open(source_path, 'rb') as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        return hashlib.sha1(f.read(min(size, TAIL_BYTES))).hexdigest()
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, 'meta.json')
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def append_npy(path, values):
+    """
+    Append rows to a .npy file in place: the data goes after the existing
+    rows, then the shape in the header is rewritten. Returns False, leaving
+    the file as it was, when the dtype or row shape differ or the new header
+    doesn't fit in the old one's padding.
+    """
+    values = np.ascontiguousarray(values)
+    with open(path, 'r+b') as f:
+        if np.lib.format.read_magic(f) != (1, 0):
+            return False
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        header_len = f.tell()
+        if fortran_order or dtype != values.dtype or tuple(shape[1:]) != values.shape[1:]:
+            return False
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (shape[0] + len(values), *shape[1:]),
+        })
+        if len(header.getvalue()) != header_len:
+            return False
+        # Drop anything past the rows the header counts (an interrupted append)
+        f.seek(header_len + int(np.prod(shape)) * dtype.itemsize)
+        f.truncate()
+        f.write(values.tobytes())
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def append_artifact(source_path, store_dir=None):
+    """
+    Update a stale artifact whose source file has only had bars appended:
+    parse just the bytes after the ones it was built from and append them
+    to the .npy columns in place (append_npy), so the cost is the new bars,
+    not the file. Returns the new meta, or None when the artifact is
+    missing or the file changed in any other way (build_artifact then).
+    """
+    target = artifact_dir(source_path, store_dir)
+    try:
+        with open(os.path.join(target, 'meta.json')) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    _, mtime_ns, size = file_fingerprint(source_path)
+    old_size = meta.get('source_size', 0)
+    if meta.get('format') != STORE_FORMAT or 'source_tail' not in meta or size <= old_size:
+        return None
+    if _source_tail(source_path, old_size) != meta['source_tail']:
+        return None
+    with open(source_path, 'rb') as f:
+        f.seek(max(0, old_size - 1))
+        boundary = f.read(2)
+    # The old last line must have been complete: ended by a newline, or followed by one
+    if not (boundary[:1] == b'\n' or boundary[1:2] in (b'\n', b'\r')):
+        return None
+
+    try:
+        columns = {name: np.load(os.path.join(target, f'{name}.npy'), mmap_mode='r') for name in meta['columns']}
+    except (FileNotFoundError, ValueError):
+        return None
+    # A column longer than meta.json says is left from an interrupted append
+    if any(len(values) != meta['rows'] for values in columns.values()):
+        return None
+    last = columns['date'][-1] if meta['rows'] else None
+    parts = [prices for _, prices in read_chunks(source_path, offset=old_size)]
+    if not parts:
+        return None
+    new = {name: np.concatenate([part[name] for part in parts]) for name in columns}
+    dates = new['date']
+    if np.any(dates[1:] < dates[:-1]) or (last is not None and dates[0] < last):
+        return None
+    if any(np.result_type(columns[name].dtype, values.dtype) != columns[name].dtype for name, values in new.items()):
+        return None
+    del columns
+
+    for name, values in new.items():
+        if not append_npy(os.path.join(target, f'{name}.npy'), values.astype(meta['columns'][name])):
+            return None
+    meta.update(
+        source_mtime_ns=mtime_ns,
+        source_size=size,
+        source_tail=_source_tail(source_path, size),
+        rows=meta['rows'] + len(dates),
+    )
+    _write_meta(target, meta)
+    return meta
+
+
+def refresh_artifact(source_path, store_dir=None):
+    """
+    The fresh columns for source_path: the artifact as is, with appended
+    bars added in place, or rebuilt when the file was otherwise changed.
+    """
+    prices = load_artifact(source_path, store_dir)
+    if prices is None:
+        if append_artifact(source_path, store_dir) is None:
+            build_artifact(source_path, store_dir)
+        prices = load_artifact(source_path, store_dir)
+    return prices
+
+
+def _write_chunked(source_path, directory, chunk_bytes):
+    """
+    Stream a date-sorted source file into .npy columns in directory: chunks are
+    appended to raw files, then copied into arrays of the common dtype (a chunk
+    with missing volumes makes that column float). Returns (rows, {column: dtype}).
+    """
+    segments = {}
+    last_date = None
+    for _, prices in read_chunks(source_path, chunk_bytes):
+        dates = prices['date']
+        if np.any(dates[1:] < dates[:-1]) or (last_date is not None and dates[0] < last_date):
+            raise ValueError(f"{os.path.basename(source_path)} is not in date order; build it without chunking")
+        last_date = dates[-1]
+        for name, values in prices.items():
+            with open(os.path.join(directory, f'{name}.raw'), 'ab') as f:
+                np.ascontiguousarray(values).tofile(f)
+            segments.setdefault(name, []).append((values.dtype, len(values)))
+
+    rows = sum(count for _, count in segments.get('date', ()))
+    dtypes = {}
+    for name in ('date', *COLUMNS):
+        dtype = np.result_type(*(dtype for dtype, _ in segments[name])) if rows else np.dtype(
+            np.int64 if name == 'date' else np.float64
+        )
+        out = np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=dtype, shape=(rows,))
+        position = 0
+        raw = os.path.join(directory, f'{name}.raw')
+        if rows:
+            with open(raw, 'rb') as f:
+                for segment_dtype, count in segments[name]:
+                    out[position:position + count] = np.fromfile(f, dtype=segment_dtype, count=count)
+                    position += count
+            os.remove(raw)
+        out.flush()
+        del out
+        dtypes[name] = dtype
+    return rows, dtypes
+
+
+def load_artifact(source_path, store_dir=None):
+    """
+    Memory-map the columns for source_path.
+    Returns None when the artifact is missing or older than the source file.
+    """
+    target = artifact_dir(source_path, store_dir)
+    try:
+        with open(os.path.join(target, 'meta.json')) as f:
+            meta = json.load(f)
+        _, mtime_ns, size = file_fingerprint(source_path)
+        if (meta.get('format') != STORE_FORMAT
+                or meta['source_mtime_ns'] != mtime_ns
+                or meta['source_size'] != size):
+            return None
+        prices = {
+            name: np.load(os.path.join(target, f'{name}.npy'), mmap_mode='r')
+            for name in meta['columns']
+        }
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+    if any(len(values) != meta['rows'] for values in prices.values()):
+        return None
+    return prices
+
+
+def load_prices(source_path, store_dir=None):
+    """
+    Column arrays for source_path, from the binary store when it is fresh
+    and from the source file otherwise.
+    """
+    prices = load_artifact(source_path, store_dir)
+    if prices is None:
+        prices = read_source(source_path)
+    return prices
+
+
+def _date_ns(day):
+    return np.datetime64(day, 'ns').astype('int64')
+
+
+def slice_dates(prices, start=None, end=None):
+    """
+    Restrict price columns to start <= date <= end (datetime.date, either may be None)
+    by binary search on the sorted date column. Slices are views, nothing is copied.
+    """
+    if start is None and end is None:
+        return prices
+    dates = prices['date']
+    lo = 0 if start is None else np.searchsorted(dates, _date_ns(start), side='left')
+    hi = len(dates) if end is None else np.searchsorted(dates, _date_ns(end) + DAY_NS, side='left')
+    return {name: values[lo:hi] for name, values in prices.items()}
+
+
+def prices_from_db(symbol, start=None, end=None):
+    """
+    Price columns for `symbol` from core.Stock, read with one values_list query
+    over the (symbol, date) index and converted straight into arrays.
+    """
+    from .models import Stock
+
+    rows = Stock.objects.filter(symbol=symbol)
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    rows = rows.order_by('date').values_list('date', *DB_FIELDS.values())
+
+    table = np.fromiter(rows.iterator(chunk_size=10000), dtype=DB_DTYPE)
+    prices = {'date': table['date'].astype('datetime64[ns]').view('int64')}
+    for name in DB_FIELDS:
+        prices[name] = np.ascontiguousarray(table[name])
+    return prices
+
+
+def db_fingerprint(symbol):
+    """
+    Cheap identity of a symbol's rows in core.Stock (answered from the
+    indexes), or None when there are none. The latest updated_at changes
+    with every insert or in-place correction, the row count with deletes.
+    """
+    from django.db.models import Count, Max, Min
+    from .models import Stock
+
+    stats = Stock.objects.filter(symbol=symbol).aggregate(
+        rows=Count('id'), first=Min('date'), last=Max('date'), updated=Max('updated_at'),
+    )
+    if not stats['rows']:
+        return None
+    return ('db', symbol, stats['rows'], stats['first'], stats['last'], stats['updated'])
@@ -0,0 +1,219 @@
+import numpy as np
+
+# Eigenvalues of the feature correlation matrix below RCOND * largest are
+# treated as exact collinearity (e.g. Range == High - Low)
+RCOND = 1e-12
+
+# Rows centred and multiplied into X'X at a time, bounding the float64 working
+# copy for long (or float32) feature matrices
+BLOCK_ROWS = 65_536
+
+
+def solve_normal_equations(n, sum_x, sum_y, xtx, xty, rcond=RCOND):
+    """
+    Least-squares fit with intercept from sufficient statistics.
+
+    n, sum_x (..., p), sum_y (..., k), xtx (..., p, p) and xty (..., p, k)
+    may carry leading batch dimensions; k right-hand sides share one
+    eigendecomposition of the centred, correlation-scaled X'X.
+    Rank-deficient systems get the minimum-norm solution, the same one
+    sklearn's LinearRegression (lstsq) returns.
+    Returns coef (..., p, k) and intercept (..., k).
+    """
+    n = np.asarray(n, dtype=np.float64)[..., None]
+    mean_x = sum_x / n
+    mean_y = sum_y / n
+    sxx = xtx - n[..., None] * mean_x[..., :, None] * mean_x[..., None, :]
+    sxy = xty - n[..., None] * mean_x[..., :, None] * mean_y[..., None, :]
+
+    # Scale to a correlation matrix so Volume (~1e8) and prices (~1e0) are comparable
+    scale = np.sqrt(np.clip(np.diagonal(sxx, axis1=-2, axis2=-1), 0, None))
+    scale = np.where(scale > 0, scale, 1.0)
+    corr = sxx / (scale[..., :, None] * scale[..., None, :])
+    w, v = np.linalg.eigh(corr)
+    keep = w > rcond * w[..., -1:]
+    inv_w = np.where(keep, 1.0 / np.where(keep, w, 1.0), 0.0)
+
+    vt_c = np.swapaxes(v, -1, -2) @ (sxy / scale[..., :, None])
+    coef = (v @ (inv_w[..., :, None] * vt_c)) / scale[..., :, None]
+
+    # Minimum norm in the original units: remove the component along the null space
+    if not keep.all():
+        null = v * (~keep)[..., None, :] / scale[..., :, None]
+        null_t = np.swapaxes(null, -1, -2)
+        coef = coef - null @ (np.linalg.pinv(null_t @ null) @ (null_t @ coef))
+
+    intercept = mean_y - np.einsum('...p,...pk->...k', mean_x, coef)
+    return coef, intercept
+
+
+def regression_metrics(y_true, y_pred):
+    """
+    RMSE, MAPE and R^2 along axis 0, computed as sklearn.metrics does.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    residual = y_true - y_pred
+    rmse = np.sqrt(np.mean(residual ** 2, axis=0))
+    mape = np.mean(np.abs(residual) / np.maximum(np.abs(y_true), np.finfo(np.float64).eps), axis=0)
+    ss_res = np.sum(residual ** 2, axis=0)
+    ss_tot = np.sum((y_true - y_true.mean(axis=0)) ** 2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.where(ss_res == 0, 1.0, 0.0))
+    return rmse, mape, r2
+
+
+class IncrementalOLS:
+    """
+    Ordinary least squares maintained from X'X, X'y and column sums.
+
+    partial_fit appends rows and remove drops them (for a sliding training
+    window); either way the refit solves a (p x p) system instead of
+    re-reading the history. Sums are kept relative to the mean of the first
+    batch, which keeps centring accurate when Volume dwarfs the prices.
+    """
+
+    def __init__(self, rcond=RCOND):
+        self.rcond = rcond
+        self.n = 0
+        self.shift_x = None
+        self.shift_y = 0.0
+        self.coef_ = None
+        self.intercept_ = None
+
+    def _reset(self, n_features):
+        self.n = 0
+        self.sum_x = np.zeros(n_features)
+        self.sum_y = 0.0
+        self.xtx = np.zeros((n_features, n_features))
+        self.xty = np.zeros(n_features)
+
+    def _accumulate(self, X, y, sign):
+        # X keeps its dtype and layout (float32 feature matrices stay float32);
+        # each block is centred into float64
+        X = np.asarray(X)
+        y = np.asarray(y, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+            y = np.atleast_1d(y)
+        if self.shift_x is None:
+            self._reset(X.shape[1])
+            self.shift_x = X.mean(axis=0, dtype=np.float64)
+            self.shift_y = float(y.mean())
+        self.n += sign * len(X)
+        for start in range(0, len(X), BLOCK_ROWS):
+            Xs = np.subtract(X[start:start + BLOCK_ROWS], self.shift_x, dtype=np.float64)
+            ys = y[start:start + BLOCK_ROWS] - self.shift_y
+            self.sum_x += sign * Xs.sum(axis=0)
+            self.sum_y += sign * ys.sum()
+            self.xtx += sign * (Xs.T @ Xs)
+            self.xty += sign * (Xs.T @ ys)
+
+    def fit(self, X, y):
+        self.shift_x = None
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        """
+        Append rows to the training set and refit.
+        """
+        self._accumulate(X, y, 1)
+        return self.solve()
+
+    def remove(self, X, y):
+        """
+        Drop rows that were previously added (oldest bars of a sliding window) and refit.
+        """
+        self._accumulate(X, y, -1)
+        return self.solve()
+
+    def solve(self):
+        if self.n <= 0:
+            raise ValueError('IncrementalOLS has no training rows')
+        coef, intercept = solve_normal_equations(
+            self.n, self.sum_x, np.array([self.sum_y]), self.xtx, self.xty[:, None], self.rcond,
+        )
+        self.coef_ = coef[:, 0]
+        self.intercept_ = float(intercept[0] + self.shift_y - self.shift_x @ self.coef_)
+        return self
+
+    def predict(self, X):
+        # float64 coefficients promote a float32 X without an explicit copy
+        return np.asarray(X) @ self.coef_ + self.intercept_
+
+    def to_dict(self):
+        """
+        Sufficient statistics and solution as arrays, for persisting a fitted model.
+        """
+        return {
+            'n': np.array(self.n),
+            'shift_x': self.shift_x,
+            'shift_y': np.array(self.shift_y),
+            'sum_x': self.sum_x,
+            'sum_y': np.array(self.sum_y),
+            'xtx': self.xtx,
+            'xty': self.xty,
+            'coef': self.coef_,
+            'intercept': np.array(self.intercept_),
+        }
+
+    @classmethod
+    def from_dict(cls, data, rcond=RCOND):
+        """
+        Rebuild a fitted model from to_dict(); it can keep learning with partial_fit.
+        """
+        model = cls(rcond)
+        model.n = int(data['n'])
+        model.shift_x = np.array(data['shift_x'])
+        model.shift_y = float(data['shift_y'])
+        model.sum_x = np.array(data['sum_x'])
+        model.sum_y = float(data['sum_y'])
+        model.xtx = np.array(data['xtx'])
+        model.xty = np.array(data['xty'])
+        model.coef_ = np.array(data['coef'])
+        model.intercept_ = float(data['intercept'])
+        return model
+
+
+class MultiTargetOLS:
+    """
+    OLS of several targets (columns of Y) on the same X: one X'X and one
+    eigendecomposition in solve_normal_equations serve every target as an
+    extra right-hand side, so k targets cost about one fit. Rows are centred
+    in float64 blocks, as in IncrementalOLS.
+    """
+
+    def __init__(self, rcond=RCOND):
+        self.rcond = rcond
+        self.coef_ = None
+        self.intercept_ = None
+
+    def fit(self, X, Y):
+        X = np.asarray(X)
+        Y = np.asarray(Y, dtype=np.float64)
+        if len(X) == 0:
+            raise ValueError('MultiTargetOLS has no training rows')
+        shift_x = X.mean(axis=0, dtype=np.float64)
+        shift_y = Y.mean(axis=0)
+        sum_x = np.zeros(X.shape[1])
+        sum_y = np.zeros(Y.shape[1])
+        xtx = np.zeros((X.shape[1], X.shape[1]))
+        xty = np.zeros((X.shape[1], Y.shape[1]))
+        for start in range(0, len(X), BLOCK_ROWS):
+            Xs = np.subtract(X[start:start + BLOCK_ROWS], shift_x, dtype=np.float64)
+            Ys = Y[start:start + BLOCK_ROWS] - shift_y
+            sum_x += Xs.sum(axis=0)
+            sum_y += Ys.sum(axis=0)
+            xtx += Xs.T @ Xs
+            xty += Xs.T @ Ys
+        coef, intercept = solve_normal_equations(len(X), sum_x, sum_y, xtx, xty, self.rcond)
+        self.coef_ = coef
+        self.intercept_ = intercept + shift_y - shift_x @ coef
+        return self
+
+    def predict(self, X):
+        """
+        Predictions (n, k), one column per target, Fortran-ordered so each
+        target's column is contiguous for the per-target metrics.
+        """
+        return (self.coef_.T @ np.asarray(X).T).T + self.intercept_
@@ -0,0 +1,109 @@
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+# Decimals kept for prices in the compact JSON encoding; float32 in the packed one
+FLOAT_DECIMALS = 4
+
+PACKED_MAGIC = b'DSP1'
+
+
+class _Buffers:
+    """
+    Binary body of a packed response: 4-byte aligned typed arrays, referenced
+    from the header as [byte offset, count].
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, values):
+        offset = self.size
+        data = values.tobytes()
+        self.chunks.append(data)
+        self.size += len(data)
+        return [offset, len(values)]
+
+
+def _encode_dates(values, buffers):
+    try:
+        days = np.asarray(values, dtype='datetime64[D]').astype(np.int64)
+    except ValueError:
+        return None
+    deltas = np.diff(days, prepend=days[0])
+    return {
+        '$dates': str(days[0].astype('datetime64[D]')),
+        'deltas': {'$i32': buffers.add(deltas.astype('<i4'))} if buffers is not None else deltas.tolist(),
+    }
+
+
+def encode_series(value, buffers=None):
+    """
+    Rewrite the arrays of a payload into the compact encoding:
+      - lists of same-keyed dicts become {'$columns': {key: column}, 'length': n}
+      - ISO date lists become {'$dates': first date, 'deltas': [day offsets]}
+      - float lists are rounded to FLOAT_DECIMALS, or with buffers given,
+        stored as float32 and replaced by {'$f32': [offset, count]}
+    Everything else is left as is; services/api.js reverses it.
+    """
+    if isinstance(value, dict):
+        return {key: encode_series(item, buffers) for key, item in value.items()}
+    if not isinstance(value, list) or not value:
+        return value
+
+    first = value[0]
+    if isinstance(first, dict):
+        keys = first.keys()
+        if all(isinstance(row, dict) and row.keys() == keys for row in value):
+            return {
+                '$columns': {key: encode_series([row[key] for row in value], buffers) for key in keys},
+                'length': len(value),
+            }
+        return [encode_series(item, buffers) for item in value]
+    if isinstance(first, str) and len(first) == 10 and first[4] == first[7] == '-':
+        return _encode_dates(value, buffers) or value
+    if isinstance(first, float):
+        try:
+            values = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            return value
+        if buffers is not None:
+            return {'$f32': buffers.add(values.astype('<f4'))}
+        return np.round(values, FLOAT_DECIMALS).tolist()
+    return value
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    JSON with date lists delta-encoded and records stored column-wise.
+    Selected with ?format=compact or Accept: application/vnd.devstock.compact+json.
+    """
+    media_type = 'application/vnd.devstock.compact+json'
+    format = 'compact'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(encode_series(data), accepted_media_type, renderer_context)
+
+
+class PackedRenderer(BaseRenderer):
+    """
+    Binary encoding: 'DSP1', uint32 little-endian header length, the JSON
+    header (padded with spaces to a multiple of 4 bytes), then the typed
+    arrays the header points into. Selected with ?format=packed or
+    Accept: application/vnd.devstock.packed.
+    """
+    media_type = 'application/vnd.devstock.packed'
+    format = 'packed'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        buffers = _Buffers()
+        header = json.dumps(encode_series(data, buffers), separators=(',', ':')).encode()
+        header += b' ' * (-(len(PACKED_MAGIC) + 4 + len(header)) % 4)
+        return b''.join([PACKED_MAGIC, struct.pack('<I', len(header)), header, *buffers.chunks])
@@ -0,0 +1,191 @@
+import bisect
+import heapq
+import math
+import threading
+import time
+from collections import Counter
+
+from .price_store import source_files
+from .tickers import TICKERS, symbol_for_file
+
+# Share of the query's trigrams a fuzzy name match must contain
+MIN_COVERAGE = 0.5
+
+# Results per search unless ?limit= says otherwise
+DEFAULT_LIMIT = 10
+
+# How often the source files are re-checked for new or removed symbols, in seconds
+INDEX_RECHECK_SECONDS = 5
+
+# Ranking tiers, best first
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, FUZZY = range(4)
+
+
+def trigrams(text):
+    """
+    Trigrams of each lower-cased word padded as '  word ', so word starts weigh more.
+    """
+    grams = set()
+    for word in text.lower().split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    Symbol and company-name search: a sorted array of symbols and name words
+    for prefix (autocomplete) lookups by bisection, and a trigram index for
+    fuzzy name matches. Symbols can be added and removed in place.
+    """
+
+    def __init__(self, listings=()):
+        self.names = {}
+        # Sorted (key, symbol) pairs; keys are upper-cased symbols and lower-cased name words
+        self._symbol_keys = []
+        self._word_keys = []
+        self._trigrams = {}
+        self._gram_counts = {}
+        for symbol, name in listings:
+            symbol = symbol.upper()
+            if symbol not in self.names:
+                self._index(symbol, name, self._symbol_keys.append, self._word_keys.append)
+        # One sort for the initial listings instead of an insertion each
+        self._symbol_keys.sort()
+        self._word_keys.sort()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, symbol):
+        return symbol in self.names
+
+    def add(self, symbol, name):
+        symbol = symbol.upper()
+        if self.names.get(symbol) == name:
+            return
+        if symbol in self.names:
+            self.remove(symbol)
+        self._index(
+            symbol, name,
+            lambda key: bisect.insort(self._symbol_keys, key),
+            lambda key: bisect.insort(self._word_keys, key),
+        )
+
+    def _index(self, symbol, name, add_symbol_key, add_word_key):
+        self.names[symbol] = name
+        add_symbol_key((symbol, symbol))
+        for word in set(name.lower().split()):
+            add_word_key((word, symbol))
+        grams = trigrams(name) | trigrams(symbol)
+        self._gram_counts[symbol] = len(grams)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(symbol)
+
+    def remove(self, symbol):
+        name = self.names.pop(symbol, None)
+        if name is None:
+            return
+        del self._gram_counts[symbol]
+        _discard(self._symbol_keys, (symbol, symbol))
+        for word in set(name.lower().split()):
+            _discard(self._word_keys, (word, symbol))
+        for gram in trigrams(name) | trigrams(symbol):
+            postings = self._trigrams.get(gram)
+            if postings is not None:
+                postings.discard(symbol)
+                if not postings:
+                    del self._trigrams[gram]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Up to `limit` (symbol, name) matches for query, best first: the exact
+        symbol, symbols starting with it, names with a word starting with it
+        (each in alphabetical order), then fuzzy name matches by shared trigrams.
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        found = {}
+
+        def take(keys, prefix, tier):
+            i = bisect.bisect_left(keys, (prefix,))
+            while i < len(keys) and keys[i][0].startswith(prefix) and len(found) < limit:
+                found.setdefault(keys[i][1], tier)
+                i += 1
+
+        take(self._symbol_keys, query.upper(), SYMBOL_PREFIX)
+        if query.upper() in found:
+            found[query.upper()] = EXACT
+        take(self._word_keys, query.lower(), NAME_PREFIX)
+
+        if len(found) < limit and len(query) >= 3:
+            for symbol in self._fuzzy(query, limit - len(found), exclude=found):
+                found[symbol] = FUZZY
+
+        ranked = sorted(found.items(), key=lambda item: item[1])
+        return [(symbol, self.names[symbol]) for symbol, _ in ranked if symbol in self.names]
+
+    def _fuzzy(self, query, limit, exclude):
+        """
+        Symbols whose name holds at least MIN_COVERAGE of the query's trigrams,
+        most shared first, then shorter names.
+        """
+        # Rarest first: a name sharing `needed` grams shares one of the first len - needed + 1
+        grams = sorted(trigrams(query), key=lambda gram: len(self._trigrams.get(gram, ())))
+        needed = math.ceil(MIN_COVERAGE * len(grams))
+        # Postings are only read by set operations, which run without releasing the
+        # GIL, so a concurrent update from search_index() can't break the iteration
+        candidates = set()
+        for gram in grams[:len(grams) - needed + 1]:
+            candidates.update(self._trigrams.get(gram, ()))
+        candidates.difference_update(exclude)
+        shared = Counter()
+        for gram in grams:
+            shared.update(candidates.intersection(self._trigrams.get(gram, ())))
+        scored = (
+            (-count, self._gram_counts.get(symbol, 0), symbol)
+            for symbol, count in shared.items() if count >= needed
+        )
+        return [symbol for _, _, symbol in heapq.nsmallest(limit, scored)]
+
+
+def _discard(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def listings():
+    """
+    (symbol, company name) of every price file; unknown files are named after their symbol.
+    """
+    for path in source_files():
+        symbol = symbol_for_file(path)
+        yield symbol, TICKERS.get(symbol, (None, symbol))[1]
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def search_index():
+    """
+    This process's index, updated in place when price files are added or
+    removed. Files are re-checked at most every INDEX_RECHECK_SECONDS.
+    """
+    global _index, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < INDEX_RECHECK_SECONDS:
+        return _index
+    with _lock:
+        if _index is None:
+            _index = SearchIndex(listings())
+        elif time.monotonic() - _checked_at >= INDEX_RECHECK_SECONDS:
+            current = dict(listings())
+            for symbol in [s for s in _index.names if s not in current]:
+                _index.remove(symbol)
+            for symbol, name in current.items():
+                _index.add(symbol, name)
+        _checked_at = time.monotonic()
+    return _index
@@ -1,8 +1,36 @@
 from rest_framework import serializers
-from .models import Stock
+from .models import Prediction, Stock
 
 class StockSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stock
         fields = '__all__'
 
+
+
+class PredictionSerializer(serializers.ModelSerializer):
+    currentPrice = serializers.FloatField(source='current_price')
+    nextPrice = serializers.FloatField(source='next_price')
+    changePercent = serializers.FloatField(source='change_percent')
+    asOf = serializers.DateField(source='as_of')
+    modelVersion = serializers.CharField(source='model_version')
+    confidence = serializers.SerializerMethodField()
+    trend = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Prediction
+        fields = [
+            'symbol', 'name', 'currentPrice', 'nextPrice', 'changePercent', 'confidence', 'trend',
+            'asOf', 'rmse', 'mape', 'r2', 'modelVersion',
+        ]
+
+    def get_confidence(self, obj):
+        # Share of the price the model gets right on average over the test set
+        return max(0, round((1 - obj.mape) * 100))
+
+    def get_trend(self, obj):
+        if obj.change_percent > 0.5:
+            return 'bullish'
+        if obj.change_percent < -0.5:
+            return 'bearish'
+        return 'neutral'
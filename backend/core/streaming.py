@@ -0,0 +1,108 @@
+import numpy as np
+
+from .price_store import CHUNK_BYTES, read_chunks, slice_dates
+from .regression import IncrementalOLS
+
+
+class ChunkFeatures:
+    """
+    Feature rows of a bar stream fed one chunk at a time. The last lookback + 1
+    bars of each chunk are carried into the next, so windows spanning a chunk
+    boundary see the same bars as on the whole series, and a chunk's last bar
+    waits for the next chunk's close as its target.
+    """
+
+    def __init__(self, plan, tail=None):
+        if plan.lookback is None:
+            raise ValueError('Streaming needs finite-window features (no ema, rsi or other recursive kinds)')
+        self.plan = plan
+        self.tail = tail
+
+    def push(self, prices):
+        """
+        Add a chunk of date-sorted bars. Returns (dates, X, y), X's columns in
+        plan order, of the rows it completes that have every feature and a
+        next-bar target, as the rows build_features(...).dropna() keeps.
+        """
+        if not len(prices['date']):
+            return prices['date'], np.empty((0, len(self.plan.names))), np.empty(0)
+        if self.tail is None:
+            bars, start = prices, 0
+        else:
+            bars = {name: np.concatenate([self.tail[name], values]) for name, values in prices.items()}
+            start = len(self.tail['date']) - 1
+
+        X = self.plan.matrix(bars)[start:-1]
+        y = np.asarray(bars['close'][start + 1:], dtype=np.float64)
+        keep = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        self.tail = {name: np.array(values[-(self.plan.lookback + 1):]) for name, values in bars.items()}
+        return bars['date'][start:-1][keep], X[keep], y[keep]
+
+
+def _sorted_chunks(source_path, chunk_bytes, offset=None, start=None, end=None):
+    """
+    read_chunks restricted to start <= date <= end, checking the file is in date order.
+    """
+    last = None
+    for position, prices in read_chunks(source_path, chunk_bytes, offset):
+        dates = prices['date']
+        if np.any(dates[1:] < dates[:-1]) or (last is not None and dates[0] < last):
+            raise ValueError('Streaming needs a source file in date order')
+        last = dates[-1]
+        yield position, slice_dates(prices, start, end)
+
+
+def _statistics(model):
+    # Copies: partial_fit updates the model's arrays in place
+    return {name: np.array(value) for name, value in model.to_dict().items()}
+
+
+def stream_fit(source_path, plan, split, start=None, end=None, chunk_bytes=CHUNK_BYTES, keep_bars=0):
+    """
+    Fit and evaluate the model on a price file too large to load, with the
+    same chronological train/test split as fit_stock_model.
+
+    The first pass computes the features chunk by chunk, counts the complete
+    rows and accumulates the regression statistics, checkpointing them (with
+    the carried bars) at every chunk. The second pass resumes at the chunk
+    holding the split row, finishes the fit and predicts the test rows, which
+    are the only rows kept. Memory is bounded by the chunk size plus the test
+    outputs. Returns (model, test dates, actual, predicted, last keep_bars
+    bars); model is None when there are no test rows.
+    """
+    features = ChunkFeatures(plan)
+    model = IncrementalOLS()
+    checkpoints = []
+    rows = 0
+    for offset, prices in _sorted_chunks(source_path, chunk_bytes, None, start, end):
+        checkpoints.append((offset, rows, _statistics(model) if rows else None, features.tail))
+        _, X, y = features.push(prices)
+        if len(y):
+            model.partial_fit(X, y)
+            rows += len(y)
+
+    split_index = int(rows * split)
+    if rows - split_index == 0:
+        return None, None, None, None, None
+
+    offset, seen, statistics, tail = next(c for c in reversed(checkpoints) if c[1] <= split_index)
+    model = IncrementalOLS.from_dict(statistics) if statistics is not None else IncrementalOLS()
+    features = ChunkFeatures(plan, tail)
+    dates, actual, predicted = [], [], []
+    last_bars = None
+    for _, prices in _sorted_chunks(source_path, chunk_bytes, offset, start, end):
+        chunk_dates, X, y = features.push(prices)
+        train = max(0, min(len(y), split_index - seen))
+        if train:
+            model.partial_fit(X[:train], y[:train])
+        if train < len(y):
+            dates.append(chunk_dates[train:])
+            actual.append(y[train:])
+            predicted.append(model.predict(X[train:]))
+        seen += len(y)
+        if keep_bars:
+            last_bars = {
+                name: np.concatenate([last_bars[name], values])[-keep_bars:] if last_bars else np.array(values[-keep_bars:])
+                for name, values in prices.items()
+            }
+    return model, np.concatenate(dates), np.concatenate(actual), np.concatenate(predicted), last_bars
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import warnings
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import main_model, market
+from .batch import batch_predict
+from .features import FeaturePlan
+from .grid_search import run_grid_search
+from .history import MAX_POINTS, MIN_POINTS, lttb_indices, price_history
+from .incremental import load_features, refresh_features
+from .main_model import (
+    FEATURE_PLAN, feature_matrix, features_list, fit_horizons, fit_stock_model, script_dir, split_percentage,
+    stream_stock_model,
+)
+from .market import latest_bars
+from .price_store import load_artifact, load_prices, read_source, slice_dates
+from .regression import IncrementalOLS, MultiTargetOLS
+from .renderers import FLOAT_DECIMALS, PACKED_MAGIC, CompactJSONRenderer, PackedRenderer
+from .search import SearchIndex
+
+
+def random_walk(rows, seed=0):
+    """
+    Date-sorted daily OHLCV bars in the load_prices layout.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    start = np.datetime64('2000-01-03', 'ns').astype(np.int64)
+    return {
+        'date': start + np.arange(rows, dtype=np.int64) * 86_400_000_000_000,
+        'open': close * 0.999,
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': rng.integers(1_000, 100_000, rows).astype(np.float64),
+    }
+
+
+def decode_series(value, body=None):
+    """
+    Python port of decodeSeries in frontend/src/services/api.js.
+    """
+    if isinstance(value, list):
+        return [decode_series(item, body) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '$f32' in value:
+        offset, count = value['$f32']
+        return np.frombuffer(body, '<f4', count, offset).astype(np.float64).tolist()
+    if '$i32' in value:
+        offset, count = value['$i32']
+        return np.frombuffer(body, '<i4', count, offset).tolist()
+    if '$dates' in value:
+        days = np.datetime64(value['$dates'], 'D') + np.cumsum(decode_series(value['deltas'], body))
+        return np.datetime_as_string(days, unit='D').tolist()
+    if '$columns' in value:
+        columns = {key: decode_series(column, body) for key, column in value['$columns'].items()}
+        return [{key: column[i] for key, column in columns.items()} for i in range(value['length'])]
+    return {key: decode_series(item, body) for key, item in value.items()}
+
+
+class RegressionTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Volume-like column five orders of magnitude above the others
+        self.X = np.column_stack([rng.normal(100, 5, 3000), rng.normal(0, 1, 3000), rng.normal(1e6, 1e5, 3000)])
+        self.y = self.X @ [0.5, -2.0, 3e-6] + 7 + rng.normal(0, 0.1, 3000)
+
+    def test_matches_sklearn(self):
+        from sklearn.linear_model import LinearRegression
+
+        expected = LinearRegression().fit(self.X, self.y)
+        model = IncrementalOLS().fit(self.X, self.y)
+        np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-8)
+        self.assertAlmostEqual(model.intercept_, expected.intercept_, places=6)
+        np.testing.assert_allclose(model.predict(self.X), expected.predict(self.X), rtol=1e-10)
+
+    def test_partial_fit_and_remove(self):
+        full = IncrementalOLS().fit(self.X, self.y)
+        model = IncrementalOLS()
+        for start in range(0, 3000, 700):
+            model.partial_fit(self.X[start:start + 700], self.y[start:start + 700])
+        np.testing.assert_allclose(model.coef_, full.coef_, rtol=1e-9)
+
+        model.partial_fit(self.X[:500] * 2, self.y[:500])
+        model.remove(self.X[:500] * 2, self.y[:500])
+        np.testing.assert_allclose(model.coef_, full.coef_, rtol=1e-8)
+        restored = IncrementalOLS.from_dict(model.to_dict())
+        np.testing.assert_allclose(restored.predict(self.X), model.predict(self.X))
+
+    def test_multi_target_matches_single_fits(self):
+        Y = np.column_stack([self.y, np.roll(self.y, 3), self.X[:, 1]])
+        model = MultiTargetOLS().fit(self.X, Y)
+        predicted = model.predict(self.X)
+        for j in range(Y.shape[1]):
+            single = IncrementalOLS().fit(self.X, Y[:, j])
+            np.testing.assert_allclose(predicted[:, j], single.predict(self.X), rtol=1e-8, atol=1e-8)
+
+
+class FeatureTests(SimpleTestCase):
+    def test_rolling_matches_pandas_with_missing_bars(self):
+        prices = random_walk(2000)
+        prices['close'][[0, 500, 1201, 1202]] = np.nan
+        out = FeaturePlan(['sma_7', 'sma_30', 'std_7', 'std_30']).execute(prices)
+        close = pd.Series(prices['close'])
+        for window in (7, 30):
+            rolling = close.rolling(window)
+            np.testing.assert_allclose(out[f'sma_{window}'], rolling.mean(), rtol=1e-12, equal_nan=True)
+            np.testing.assert_allclose(out[f'std_{window}'], rolling.std(), rtol=1e-9, equal_nan=True)
+
+    def test_rolling_std_is_stable_on_long_series(self):
+        # Minute bars around 1000 moving by 0.01: running totals of x^2 reach
+        # 1e12 while a window's squared deviations are 1e-4
+        rng = np.random.default_rng(0)
+        close = 1000 + np.cumsum(rng.normal(0, 0.01, 1_000_000))
+        out = FeaturePlan(['sma_7', 'std_7']).execute({'close': close})
+        np.testing.assert_allclose(out['std_7'], pd.Series(close).rolling(7).std(), rtol=1e-3, equal_nan=True)
+        windows = np.lib.stride_tricks.sliding_window_view(close[-100_000:], 7)
+        np.testing.assert_allclose(out['std_7'][-len(windows):], windows.std(axis=-1, ddof=1), rtol=1e-10)
+        np.testing.assert_allclose(out['sma_7'][-len(windows):], windows.mean(axis=-1), rtol=1e-14)
+
+
+class MarketTests(SimpleTestCase):
+    def test_latest_bars_with_missing_volume(self):
+        prices = random_walk(30)
+        prices['volume'][-1] = np.nan
+        bar = latest_bars(prices)
+        self.assertEqual(bar['volume'], 0)
+        self.assertAlmostEqual(bar['avg_volume'], np.mean(prices['volume'][-20:-1]))
+
+        prices['volume'][:] = np.nan
+        self.assertEqual(latest_bars(prices)['avg_volume'], 0.0)
+
+
+class PipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(script_dir, 'TSLA.csv')
+        self.prices = load_prices(self.path)
+
+    def test_streaming_matches_in_memory(self):
+        _, expected = fit_stock_model(self.prices, 'Tesla', verbose=False)
+        for start, end in ((None, None), (datetime.date(2015, 1, 1), datetime.date(2019, 6, 30))):
+            if start is not None:
+                _, expected = fit_stock_model(slice_dates(self.prices, start, end), 'Tesla', verbose=False)
+            # Small chunks, so windows and the train/test split straddle chunk boundaries
+            _, result, _ = stream_stock_model(self.path, 'Tesla', start, end, verbose=False, chunk_bytes=4096)
+            self.assertEqual(result['dates'], expected['dates'])
+            np.testing.assert_allclose(result['predicted_prices'], expected['predicted_prices'], rtol=1e-8)
+            self.assertAlmostEqual(result['mape'], expected['mape'], places=10)
+
+    def test_large_xls_named_files_stream(self):
+        _, expected = fit_stock_model(load_prices(os.path.join(script_dir, 'Apple.xls')), 'Apple', verbose=False)
+        with mock.patch.object(main_model, 'STREAM_THRESHOLD_BYTES', 0), \
+                mock.patch.object(main_model, 'save_model_artifact'), \
+                mock.patch.object(main_model.model_cache, 'get', return_value=None), \
+                mock.patch.object(main_model, 'load_prices', side_effect=AssertionError('full load')), \
+                mock.patch.object(main_model, 'stream_stock_model', wraps=stream_stock_model) as stream, \
+                self.assertLogs('core', 'INFO'):
+            result = main_model.analyze_stock('Apple.xls', 'Apple')
+        stream.assert_called_once()
+        self.assertEqual(result['dates'], expected['dates'])
+        np.testing.assert_allclose(result['predicted_prices'], expected['predicted_prices'], rtol=1e-8)
+
+    def test_batch_matches_single_fits(self):
+        results, errors = batch_predict(['TSLA', 'AAPL'], include_series=True)
+        self.assertEqual(errors, {})
+        for result in results:
+            filename = 'TSLA.csv' if result['symbol'] == 'TSLA' else 'Apple.xls'
+            _, expected = fit_stock_model(load_prices(os.path.join(script_dir, filename)), '', verbose=False)
+            self.assertEqual(result['dates'], expected['dates'])
+            np.testing.assert_allclose(result['predicted_prices'], expected['predicted_prices'], rtol=1e-6)
+            self.assertAlmostEqual(result['r2'], expected['r2'], places=6)
+
+    def test_horizons_are_aligned(self):
+        horizons = (1, 5, 20)
+        _, result = fit_horizons(self.prices, 'Tesla', horizons, verbose=False)
+        days = np.asarray(self.prices['date']).astype('datetime64[ns]').astype('datetime64[D]')
+        rows = np.searchsorted(days, np.array(result['dates'], dtype='datetime64[D]'))
+        for h in horizons:
+            np.testing.assert_array_equal(result['horizons'][str(h)]['actual_prices'], self.prices['close'][rows + h])
+
+        # Each horizon's fit is the single-target fit on the same rows
+        _, X, Y = feature_matrix(self.prices, horizons=horizons)
+        split = int(len(Y) * split_percentage)
+        single = IncrementalOLS().fit(X[:split], Y[:split, 1])
+        np.testing.assert_allclose(result['horizons']['5']['predicted_prices'], single.predict(X[split:]), rtol=1e-8)
+
+
+class RendererTests(SimpleTestCase):
+    def payload(self):
+        rows, _ = price_history(random_walk(400), 'max')
+        _, result = fit_stock_model(random_walk(400, seed=1), 'Test', verbose=False)
+        return {'symbol': 'TEST', 'history': rows, 'prediction': result, 'empty': []}
+
+    def test_compact_round_trip(self):
+        data = self.payload()
+        decoded = decode_series(json.loads(CompactJSONRenderer().render(data)))
+        self.assertEqual(decoded['history'][0].keys(), data['history'][0].keys())
+        self.assertEqual([row['date'] for row in decoded['history']], [row['date'] for row in data['history']])
+        np.testing.assert_allclose(
+            decoded['prediction']['predicted_prices'], data['prediction']['predicted_prices'], atol=10 ** -FLOAT_DECIMALS,
+        )
+        self.assertEqual(decoded['prediction']['dates'], data['prediction']['dates'])
+        self.assertEqual((decoded['symbol'], decoded['empty']), ('TEST', []))
+
+    def test_packed_round_trip(self):
+        data = self.payload()
+        body = PackedRenderer().render(data)
+        self.assertEqual(body[:4], PACKED_MAGIC)
+        (length,) = struct.unpack('<I', body[4:8])
+        self.assertEqual((8 + length) % 4, 0)
+        decoded = decode_series(json.loads(body[8:8 + length]), body[8 + length:])
+        self.assertEqual([row['volume'] for row in decoded['history']], [row['volume'] for row in data['history']])
+        np.testing.assert_allclose([row['price'] for row in decoded['history']], [row['price'] for row in data['history']], rtol=1e-6)
+        np.testing.assert_allclose(decoded['prediction']['actual_prices'], data['prediction']['actual_prices'], rtol=1e-6)
+        self.assertEqual(decoded['prediction']['dates'], data['prediction']['dates'])
+
+
+class SearchTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SearchIndex([
+            ('AMZN', 'Amazon'), ('AMD', 'Advanced Micro Devices'), ('AM', 'Antero Midstream'),
+            ('META', 'Meta Platforms'), ('AAPL', 'Apple'), ('APLE', 'Apple Hospitality REIT'),
+        ])
+
+    def test_ranking_tiers(self):
+        # Exact symbol, then symbol prefixes, then name-word prefixes
+        self.assertEqual([s for s, _ in self.index.search('am')], ['AM', 'AMD', 'AMZN'])
+        self.assertEqual([s for s, _ in self.index.search('apple')], ['AAPL', 'APLE'])
+        self.assertEqual(self.index.search('micro')[0], ('AMD', 'Advanced Micro Devices'))
+        self.assertEqual(self.index.search('am', limit=1), [('AM', 'Antero Midstream')])
+
+    def test_fuzzy_match_and_updates(self):
+        self.assertEqual(self.index.search('amazn')[0][0], 'AMZN')
+        self.index.remove('AMZN')
+        self.index.add('NFLX', 'Netflix')
+        self.assertNotIn('AMZN', [s for s, _ in self.index.search('amazon')])
+        self.assertEqual(self.index.search('netf'), [('NFLX', 'Netflix')])
+
+
+class HistoryTests(SimpleTestCase):
+    def test_lttb_keeps_ends_and_count(self):
+        x = np.arange(1000, dtype=np.float64)
+        keep = lttb_indices(x, np.sin(x / 50), 100)
+        self.assertEqual(len(keep), 100)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_lttb_below_three_points(self):
+        x = np.arange(10, dtype=np.float64)
+        self.assertEqual(lttb_indices(x, x, 2).tolist(), [0, 9])
+        self.assertEqual(lttb_indices(x, x, 1).tolist(), [9])
+        self.assertEqual(lttb_indices(x, x, 0).tolist(), [])
+        self.assertEqual(lttb_indices(x, x, -5).tolist(), [])
+
+    def test_points_are_bounded(self):
+        prices = random_walk(5000)
+        for points in (-5, 0, 1, 2, 3, 300, 10_000):
+            for agg in ('lttb', 'ohlc'):
+                rows, total = price_history(prices, 'max', max_points=points, agg=agg)
+                self.assertEqual(total, 5000)
+                self.assertGreaterEqual(len(rows), MIN_POINTS, (points, agg))
+                self.assertLessEqual(len(rows), max(MIN_POINTS, min(points, MAX_POINTS)), (points, agg))
+
+    def test_missing_volume_counts_as_zero(self):
+        prices = random_walk(500)
+        prices['volume'][[10, 11, 499]] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            rows, _ = price_history(prices, 'max')
+            buckets, _ = price_history(prices, 'max', max_points=50, agg='ohlc')
+        self.assertEqual([rows[i]['volume'] for i in (10, 11, 499)], [0, 0, 0])
+        self.assertEqual(sum(row['volume'] for row in buckets), int(np.nansum(prices['volume'])))
+
+    def test_history_endpoint_bounds_points(self):
+        for points in ('-5', '0', '1', '2'):
+            response = self.client.get(f'/api/stocks/AAPL/history/?range=max&points={points}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['points'], MIN_POINTS)
+
+
+class IncrementalTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.state_dir = os.path.join(self.dir.name, 'state')
+        self.store_dir = os.path.join(self.dir.name, 'store')
+
+    def write_lines(self, path, lines, count):
+        with open(path, 'wb') as f:
+            f.write(b'\n'.join(lines[:count]) + b'\n')
+
+    def test_appended_bars_extend_store_and_features(self):
+        with open(os.path.join(script_dir, 'TSLA.csv'), 'rb') as f:
+            lines = f.read().rstrip(b'\n').split(b'\n')
+        path = os.path.join(self.dir.name, 'TSLA.csv')
+        self.write_lines(path, lines, len(lines) - 10)
+        self.assertEqual(refresh_features(path, self.state_dir, self.store_dir), [])
+
+        self.write_lines(path, lines, len(lines))
+        # New bars are parsed from the appended bytes only, never the whole file
+        with mock.patch('core.price_store.read_source', side_effect=AssertionError('full parse')):
+            rows = refresh_features(path, self.state_dir, self.store_dir)
+        self.assertEqual(len(rows), 10)
+
+        full = read_source(path)
+        store = load_artifact(path, self.store_dir)
+        for name, values in full.items():
+            np.testing.assert_array_equal(store[name], values)
+        X = load_features(path, features_list, len(full['date']), self.state_dir)
+        self.assertIsNotNone(X)
+        np.testing.assert_allclose(X, FEATURE_PLAN.matrix(full), rtol=1e-10, atol=1e-10)
+        _, expected = fit_stock_model(full, 'Tesla', verbose=False)
+        _, result = fit_stock_model(full, 'Tesla', verbose=False, features=X)
+        np.testing.assert_allclose(result['predicted_prices'], expected['predicted_prices'], rtol=1e-9)
+
+    def test_rewritten_file_is_not_served_stale_features(self):
+        with open(os.path.join(script_dir, 'TSLA.csv'), 'rb') as f:
+            lines = f.read().rstrip(b'\n').split(b'\n')
+        path = os.path.join(self.dir.name, 'TSLA.csv')
+        self.write_lines(path, lines, len(lines))
+        refresh_features(path, self.state_dir, self.store_dir)
+        lines[-1] = lines[-1].replace(b',', b',1', 1)
+        self.write_lines(path, lines, len(lines))
+        self.assertIsNone(load_features(path, features_list, len(lines) - 1, self.state_dir))
+
+
+class BatchTests(SimpleTestCase):
+    def test_symbols_cannot_leave_the_data_directory(self):
+        with mock.patch('core.batch.load_prices', side_effect=AssertionError('file read')):
+            results, errors = batch_predict(['../../settings', '/etc/passwd', '..\\x', ''])
+        self.assertEqual(results, [])
+        self.assertEqual(set(errors.values()), {'Invalid symbol'})
+
+    def test_unreadable_file_only_fails_its_symbol(self):
+        def load(path):
+            if path.endswith('TSLA.csv'):
+                raise ValueError('bad row')
+            return random_walk(300)
+
+        with mock.patch('core.batch.load_prices', side_effect=load):
+            results, errors = batch_predict(['TSLA', 'AAPL'])
+        self.assertEqual([r['symbol'] for r in results], ['AAPL'])
+        self.assertIn('bad row', errors['TSLA'])
+
+
+@override_settings(ROOT_URLCONF='backend.urls_async')
+class AsyncViewTests(SimpleTestCase):
+    async def test_snapshot_views_run_off_the_event_loop(self):
+        threads = []
+        snapshot = market.market_snapshot
+
+        def record():
+            threads.append(threading.current_thread().name)
+            return snapshot()
+
+        urls = (
+            '/api/stocks/', '/api/stocks/?q=app', '/api/market/indices/', '/api/market/movers/',
+            '/api/market/screener/', '/api/market/quotes/?symbols=AAPL',
+        )
+        with mock.patch('core.views.market_snapshot', side_effect=record):
+            for url in urls:
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('analysis') for name in threads), threads)
+
+
+class HttpCacheTests(TestCase):
+    def test_unchanged_resource_revalidates_with_304(self):
+        url = '/api/stocks/AAPL/history/?range=1y'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Another representation of the same data has its own ETag
+        self.assertNotEqual(self.client.get(url, HTTP_ACCEPT='application/vnd.devstock.compact+json')['ETag'], etag)
+
+    def test_error_responses_are_not_tagged(self):
+        response = self.client.get('/api/predictions/NOPE/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+class GridSearchTests(SimpleTestCase):
+    def test_resume_reevaluates_changed_feature_sets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grid.jsonl')
+            tickers = {'TSLA': ('TSLA.csv', 'Tesla')}
+            grid = {'feature_sets': {'trend': ['close', 'sma_{window}']}, 'windows': [7], 'splits': [0.8]}
+            self.assertEqual(run_grid_search(grid, tickers, path, workers=1)[1], 1)
+            self.assertEqual(run_grid_search(grid, tickers, path, workers=1)[1], 0)
+
+            # Same config id ('trend|w=7|split=0.8'), different features
+            grid['feature_sets']['trend'] = ['close', 'std_{window}']
+            rows, evaluated, _ = run_grid_search(grid, tickers, path, workers=1)
+            self.assertEqual(evaluated, 1)
+            self.assertEqual(len(rows), 1)
+
+    def test_resume_reevaluates_changed_price_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grid.jsonl')
+            source = os.path.join(directory, 'TSLA.csv')
+            shutil.copyfile(os.path.join(script_dir, 'TSLA.csv'), source)
+            # An absolute file name is joined onto script_dir as is
+            tickers = {'TSLA': (source, 'Tesla')}
+            grid = {'feature_sets': {'prices': ['close', 'volume']}, 'windows': [], 'splits': [0.8]}
+            self.assertEqual(run_grid_search(grid, tickers, path, workers=1)[1], 1)
+
+            with open(source, 'rb') as f:
+                lines = f.read().rstrip(b'\n').split(b'\n')
+            with open(source, 'wb') as f:
+                f.write(b'\n'.join(lines[:-50]) + b'\n')
+            rows, evaluated, _ = run_grid_search(grid, tickers, path, workers=1)
+            self.assertEqual(evaluated, 1)
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]['tickers'], 1)
@@ -0,0 +1,55 @@
+import os
+import re
+
+# Ticker symbol -> (price file in backend/core/, company name)
+TICKERS = {
+    'TSLA': ('TSLA.csv', 'Tesla'),
+    'AMZN': ('Amazon.csv', 'Amazon'),
+    'GOOGL': ('GOOGL.csv', 'Google'),
+    'META': ('Facebook.xls', 'Facebook'),
+    'NFLX': ('Netflix.xls', 'Netflix'),
+    'AAPL': ('Apple.xls', 'Apple'),
+}
+
+# ?choice=N on the legacy /api/stock/ endpoint (same order as the main_menu CLI)
+STOCK_CHOICES = {
+    1: 'TSLA',
+    2: 'AMZN',
+    3: 'GOOGL',
+    4: 'META',
+    5: 'NFLX',
+    6: 'AAPL',
+}
+
+# Symbols that can name a <SYMBOL>.csv file in backend/core/ (no path separators)
+SYMBOL_PATTERN = re.compile(r'[A-Z0-9^][A-Z0-9.^-]{0,15}')
+
+_SYMBOL_BY_FILE = {filename.lower(): symbol for symbol, (filename, _) in TICKERS.items()}
+
+
+def symbol_for_file(path):
+    """
+    Ticker symbol for a price file. Known files map through TICKERS, new
+    files dropped into the data directory use their upper-cased file stem.
+    """
+    filename = os.path.basename(path)
+    symbol = _SYMBOL_BY_FILE.get(filename.lower())
+    if symbol is None:
+        symbol = os.path.splitext(filename)[0].upper()
+    return symbol
+
+
+def ticker_file(symbol):
+    """
+    (price file, company name) for a symbol; unknown symbols fall back to <SYMBOL>.csv.
+    """
+    symbol = symbol.upper()
+    return TICKERS.get(symbol, (f'{symbol}.csv', symbol))
+
+
+def is_valid_symbol(symbol):
+    """
+    True for a listed ticker or a symbol safe to resolve to <SYMBOL>.csv.
+    """
+    symbol = symbol.upper()
+    return symbol in TICKERS or SYMBOL_PATTERN.fullmatch(symbol) is not None
@@ -1,10 +1,62 @@
+import datetime
+import os
+
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.http import HttpResponse
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Stock
-from .serializers import StockSerializer
-from .main_model import analyze_stock
+from .models import Prediction, Stock
+from .serializers import PredictionSerializer, StockSerializer
+from .backtest import DEFAULT_MIN_TRAIN, MODES as BACKTEST_MODES, backtest_stock
+from .batch import MAX_SYMBOLS, batch_predict
+from .http_cache import (
+    conditional_api,
+    prediction_etag,
+    prediction_last_modified,
+    stock_detail_etag,
+    stock_detail_last_modified,
+    stock_etag,
+    stock_last_modified,
+)
+from .instrumentation import render_metrics
+from .history import AGGREGATIONS, MAX_POINTS, RANGE_DAYS, price_history
+from .main_model import HORIZONS, MAX_HORIZON, analyze_stock, script_dir
+from .market import MAX_RESULTS, MOVERS, SCREEN_FILTERS, SORT_COLUMNS, market_snapshot
+from .model_cache import model_cache
+from .price_store import load_prices
+from .search import DEFAULT_LIMIT as SEARCH_LIMIT, search_index
+from .renderers import CompactJSONRenderer, PackedRenderer
+from .tickers import STOCK_CHOICES, TICKERS, ticker_file
+
+
+def parse_date_param(value):
+    """
+    Parse an optional YYYY-MM-DD query parameter. Raises ValueError when malformed.
+    """
+    if not value:
+        return None
+    return datetime.date.fromisoformat(value)
+
+
+def parse_horizons_param(value):
+    """
+    Parse an optional comma-separated ?horizons= list of bar counts into a
+    sorted tuple; a bare ?horizons= means HORIZONS. Raises ValueError when malformed.
+    """
+    if value is None:
+        return None
+    if not value.strip():
+        return HORIZONS
+    horizons = tuple(sorted({int(h) for h in value.split(',') if h.strip()}))
+    if not horizons or horizons[0] < 1 or horizons[-1] > MAX_HORIZON:
+        raise ValueError(value)
+    return horizons
+
+
+# Views returning price/prediction series also speak ?format=compact and ?format=packed
+SERIES_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer, PackedRenderer]
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -17,7 +69,9 @@ class NotesView(APIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(conditional_api(stock_etag, stock_last_modified), name='dispatch')
 class StockView(APIView):
+    renderer_classes = SERIES_RENDERERS
 
     def get(self, request):
         # Get choice from query parameters (e.g., ?choice=1)
@@ -27,19 +81,10 @@ class StockView(APIView):
             return Response({'error': 'Invalid choice parameter'}, status=400)
         
         # Map choice to stock CSV and company name
-        stock_map = {
-            1: ('TSLA.csv', 'Tesla'),
-            2: ('Amazon.csv', 'Amazon'),
-            3: ('GOOGL.csv', 'Google'),
-            4: ('Facebook.xls', 'Facebook'),
-            5: ('Netflix.xls', 'Netflix'),
-            6: ('Apple.xls', 'Apple')
-        }
-        
-        if choice not in stock_map:
+        if choice not in STOCK_CHOICES:
             return Response({'error': 'Invalid choice. Please select 1-6'}, status=400)
         
-        csv_file, company_name = stock_map[choice]
+        csv_file, company_name = TICKERS[STOCK_CHOICES[choice]]
         
         try:
             result = analyze_stock(csv_filename=csv_file, company_name=company_name)
@@ -50,41 +95,64 @@ class StockView(APIView):
             return Response({'error': str(e)}, status=500)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class CacheStatsView(APIView):
+    """
+    Model cache counters for the worker process that served the request
+    GET /api/cache/stats/ - Get hits, misses and evictions
+    """
+    def get(self, request):
+        return Response(model_cache.stats())
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MetricsView(APIView):
+    """
+    Request and analyze_stock stage latency histograms for the worker process that served the request
+    GET /metrics - Prometheus text format
+    """
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class StocksListView(APIView):
     """
     List all available stocks or search stocks
     GET /api/stocks/ - List all stocks
-    GET /api/stocks/search?q=query - Search stocks
+    GET /api/stocks/search?q=query&limit=10 - Search stocks: symbol and name prefixes, then fuzzy name matches
     """
     def get(self, request):
         query = request.query_params.get('q', None)
         
-        # Stock symbols and data with complete information
-        stocks = [
-            {'symbol': 'TSLA', 'name': 'Tesla', 'price': 248.50, 'change': 5.2, 'changePercent': 2.1, 'volume': '89.4M', 'marketCap': '790.2B'},
-            {'symbol': 'AMZN', 'name': 'Amazon', 'price': 180.2, 'change': 2.5, 'changePercent': 1.4, 'volume': '45.2M', 'marketCap': '1.86T'},
-            {'symbol': 'GOOGL', 'name': 'Google', 'price': 145.8, 'change': 3.1, 'changePercent': 2.2, 'volume': '24.1M', 'marketCap': '1.78T'},
-            {'symbol': 'META', 'name': 'Meta', 'price': 520.0, 'change': 12.5, 'changePercent': 2.4, 'volume': '15.3M', 'marketCap': '1.23T'},
-            {'symbol': 'NFLX', 'name': 'Netflix', 'price': 450.3, 'change': -8.2, 'changePercent': -1.8, 'volume': '2.1M', 'marketCap': '188.5B'},
-            {'symbol': 'AAPL', 'name': 'Apple', 'price': 185.92, 'change': 3.45, 'changePercent': 1.89, 'volume': '52.3M', 'marketCap': '2.89T'},
-        ]
-        
         if query:
-            # Filter stocks by query
-            filtered = [s for s in stocks if query.lower() in s['name'].lower() or query.upper() in s['symbol']]
-            return Response(filtered)
+            try:
+                limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+            except ValueError:
+                return Response({'error': 'limit must be an integer'}, status=400)
+            matches = search_index().search(query, min(max(limit, 0), MAX_RESULTS))
+            quotes, _ = market_snapshot().quotes([symbol for symbol, _ in matches])
+            by_symbol = {quote['symbol']: quote for quote in quotes}
+            # Listings without enough bars for a quote still show up, by name only
+            return Response([by_symbol.get(symbol, {'symbol': symbol, 'name': name}) for symbol, name in matches])
         
-        return Response(stocks)
+        return Response(market_snapshot().rows())
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(conditional_api(stock_detail_etag, stock_detail_last_modified), name='dispatch')
 class StockDetailView(APIView):
     """
     Get stock details or history
     GET /api/stocks/{symbol}/ - Get stock details
+    GET /api/stocks/{symbol}/?start=2019-01-01&end=2020-12-31&source=db - Fit on a date window
     GET /api/stocks/{symbol}/history?range=1m - Get price history
+    GET /api/stocks/{symbol}/history?range=max&points=300&agg=ohlc - Downsampled history
+    GET /api/stocks/{symbol}/?format=packed - Series as float32 binary (or format=compact)
+    GET /api/stocks/{symbol}/?horizons=1,5,20 - 1-, 5- and 20-day forecasts from one shared fit
     """
+    renderer_classes = SERIES_RENDERERS
+
     def get(self, request, symbol=None):
         if not symbol:
             return Response({'error': 'Symbol parameter required'}, status=400)
@@ -92,22 +160,60 @@ class StockDetailView(APIView):
         # Get range from query params
         range_param = request.query_params.get('range', '1m')
         
+        symbol_upper = symbol.upper()
+        csv_file, company_name = ticker_file(symbol_upper)
+
         # Check if it's a history request
         if 'history' in request.path:
-            # Return mock historical data
+            if range_param not in RANGE_DAYS:
+                return Response({'error': f"Invalid range. Use one of {', '.join(RANGE_DAYS)}"}, status=400)
+            agg = request.query_params.get('agg', 'lttb')
+            if agg not in AGGREGATIONS:
+                return Response({'error': 'Invalid agg. Use lttb or ohlc'}, status=400)
+            try:
+                max_points = int(request.query_params.get('points', MAX_POINTS))
+            except ValueError:
+                max_points = MAX_POINTS
+
+            try:
+                prices = load_prices(os.path.join(script_dir, csv_file))
+            except FileNotFoundError:
+                return Response({'error': f'No price history for {symbol_upper}'}, status=404)
+            data, total = price_history(prices, range_param, max_points=max_points, agg=agg)
             return Response({
-                'symbol': symbol.upper(),
+                'symbol': symbol_upper,
                 'range': range_param,
-                'data': [
-                    {'date': '2024-01-01', 'price': 180.5, 'volume': 1000000},
-                    {'date': '2024-01-02', 'price': 185.2, 'volume': 1100000},
-                    {'date': '2024-01-03', 'price': 182.8, 'volume': 950000},
-                ]
+                'agg': agg,
+                'total': total,
+                'points': len(data),
+                'data': data,
             })
         
+        # Optional fit window and data source (?start=2019-01-01&end=2020-12-31&source=db)
+        source = request.query_params.get('source', 'file')
+        if source not in ('file', 'db'):
+            return Response({'error': 'Invalid source. Use file or db'}, status=400)
+        try:
+            start = parse_date_param(request.query_params.get('start'))
+            end = parse_date_param(request.query_params.get('end'))
+        except ValueError:
+            return Response({'error': 'Invalid start/end date, expected YYYY-MM-DD'}, status=400)
+        try:
+            horizons = parse_horizons_param(request.query_params.get('horizons'))
+        except ValueError:
+            return Response({'error': f'Invalid horizons. Use comma-separated bar counts from 1 to {MAX_HORIZON}'}, status=400)
+
         # Return stock details
         try:
-            result = analyze_stock(csv_filename=f'{symbol.upper()}.csv', company_name=symbol.upper())
+            result = analyze_stock(
+                csv_filename=csv_file,
+                company_name=company_name,
+                source=source,
+                symbol=symbol_upper,
+                start=start,
+                end=end,
+                horizons=horizons,
+            )
             return Response(result)
         except Exception as e:
             return Response({
@@ -120,9 +226,45 @@ class StockDetailView(APIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(conditional_api(stock_detail_etag, stock_detail_last_modified), name='dispatch')
+class BacktestView(APIView):
+    """
+    Walk-forward backtest of the prediction model
+    GET /api/stocks/{symbol}/backtest/ - Daily expanding-window refits after a one-year warm-up
+    GET /api/stocks/{symbol}/backtest/?mode=sliding&window=504&step=21&min_train=504 - Monthly refits on a two-year window
+    """
+    renderer_classes = SERIES_RENDERERS
+
+    def get(self, request, symbol=None):
+        mode = request.query_params.get('mode', 'expanding')
+        if mode not in BACKTEST_MODES:
+            return Response({'error': f"Invalid mode. Use one of {', '.join(BACKTEST_MODES)}"}, status=400)
+        try:
+            step = int(request.query_params.get('step', 1))
+            min_train = int(request.query_params.get('min_train', DEFAULT_MIN_TRAIN))
+            window = request.query_params.get('window')
+            window = int(window) if window else None
+        except ValueError:
+            return Response({'error': 'step, window and min_train must be integers'}, status=400)
+
+        symbol_upper = symbol.upper()
+        csv_file, _ = ticker_file(symbol_upper)
+        try:
+            prices = load_prices(os.path.join(script_dir, csv_file))
+        except FileNotFoundError:
+            return Response({'error': f'No price history for {symbol_upper}'}, status=404)
+        try:
+            result = backtest_stock(prices, mode=mode, step=step, window=window, min_train=min_train)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({'symbol': symbol_upper, **result})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(conditional_api(prediction_etag, prediction_last_modified), name='dispatch')
 class PredictionsListView(APIView):
     """
-    List predictions
+    List predictions (precomputed by `manage.py compute_predictions`)
     GET /api/predictions/ - List all predictions
     GET /api/predictions/top?limit=5 - Get top predictions
     """
@@ -133,18 +275,40 @@ class PredictionsListView(APIView):
         except ValueError:
             limit = 5
         
-        predictions = [
-            {'symbol': 'TSLA', 'name': 'Tesla', 'nextPrice': 265.3, 'confidence': 85},
-            {'symbol': 'AMZN', 'name': 'Amazon', 'nextPrice': 185.1, 'confidence': 78},
-            {'symbol': 'GOOGL', 'name': 'Google', 'nextPrice': 150.2, 'confidence': 82},
-            {'symbol': 'META', 'name': 'Meta', 'nextPrice': 535.8, 'confidence': 75},
-            {'symbol': 'NFLX', 'name': 'Netflix', 'nextPrice': 440.5, 'confidence': 80},
-        ]
+        predictions = Prediction.objects.filter(is_latest=True)
+        if 'top' in request.path:
+            # Read in order from the partial index on change_percent
+            predictions = predictions.order_by('-change_percent')
+        else:
+            predictions = predictions.order_by('symbol')
         
-        return Response(predictions[:limit])
+        return Response(PredictionSerializer(predictions[:max(limit, 0)], many=True).data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchPredictionView(APIView):
+    """
+    Fit and evaluate many tickers in one stacked computation
+    POST /api/predictions/batch/ {"symbols": ["AAPL", "TSLA"], "series": false} - Batch predictions
+    """
+    renderer_classes = SERIES_RENDERERS
+
+    def post(self, request):
+        symbols = request.data.get('symbols', [])
+        if isinstance(symbols, str):
+            symbols = [s for s in symbols.split(',') if s.strip()]
+        if not isinstance(symbols, list) or not symbols:
+            return Response({'error': 'symbols must be a non-empty list'}, status=400)
+        if len(symbols) > MAX_SYMBOLS:
+            return Response({'error': f'At most {MAX_SYMBOLS} symbols per request'}, status=400)
+
+        include_series = str(request.data.get('series', 'false')).lower() in ('1', 'true')
+        results, errors = batch_predict([str(s).strip() for s in symbols], include_series=include_series)
+        return Response({'predictions': results, 'errors': errors})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(conditional_api(prediction_etag, prediction_last_modified), name='dispatch')
 class PredictionDetailView(APIView):
     """
     Get prediction for specific stock
@@ -154,72 +318,11 @@ class PredictionDetailView(APIView):
         if not symbol:
             return Response({'error': 'Symbol parameter required'}, status=400)
         
-        # Map of stocks with their predictions
-        stock_prices = {
-            'TSLA': 248.50,
-            'AMZN': 180.2,
-            'GOOGL': 145.8,
-            'META': 520.0,
-            'NFLX': 450.3,
-            'AAPL': 185.92,
-        }
-        
-        predictions = {
-            'TSLA': {
-                'symbol': 'TSLA',
-                'name': 'Tesla',
-                'currentPrice': 248.50,
-                'nextPrice': 265.3,
-                'confidence': 85,
-                'trend': 'bullish'
-            },
-            'AMZN': {
-                'symbol': 'AMZN',
-                'name': 'Amazon',
-                'currentPrice': 180.2,
-                'nextPrice': 185.1,
-                'confidence': 78,
-                'trend': 'neutral'
-            },
-            'GOOGL': {
-                'symbol': 'GOOGL',
-                'name': 'Google',
-                'currentPrice': 145.8,
-                'nextPrice': 150.2,
-                'confidence': 82,
-                'trend': 'bullish'
-            },
-            'META': {
-                'symbol': 'META',
-                'name': 'Meta',
-                'currentPrice': 520.0,
-                'nextPrice': 535.8,
-                'confidence': 75,
-                'trend': 'neutral'
-            },
-            'NFLX': {
-                'symbol': 'NFLX',
-                'name': 'Netflix',
-                'currentPrice': 450.3,
-                'nextPrice': 440.5,
-                'confidence': 80,
-                'trend': 'bullish'
-            },
-            'AAPL': {
-                'symbol': 'AAPL',
-                'name': 'Apple',
-                'currentPrice': 185.92,
-                'nextPrice': 205.2,
-                'confidence': 79,
-                'trend': 'bullish'
-            },
-        }
-        
-        symbol_upper = symbol.upper()
-        prediction = predictions.get(symbol_upper)
+        # Latest row via the (symbol, -as_of) index
+        prediction = Prediction.objects.filter(symbol=symbol.upper()).order_by('-as_of').first()
         if not prediction:
             return Response({'error': 'Prediction not found'}, status=404)
-        return Response(prediction)
+        return Response(PredictionSerializer(prediction).data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -270,16 +373,11 @@ class NewsDetailView(APIView):
 class MarketIndicesView(APIView):
     """
     Get market indices
-    GET /api/market/indices/ - Get indices
+    GET /api/market/indices/ - Price-weighted composite of every stock's latest bar, with breadth
     """
     def get(self, request):
-        return Response({
-            'indices': [
-                {'symbol': '^GSPC', 'name': 'S&P 500', 'value': 4890.5, 'change': 0.8},
-                {'symbol': '^IXIC', 'name': 'NASDAQ', 'value': 15320.2, 'change': 1.2},
-                {'symbol': '^DJI', 'name': 'Dow Jones', 'value': 38500.8, 'change': 0.5},
-            ]
-        })
+        composite = market_snapshot().composite()
+        return Response({'indices': [composite] if composite else []})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -300,30 +398,65 @@ class MarketStatusView(APIView):
 class MarketMoversView(APIView):
     """
     Get top market movers
-    GET /api/market/movers?type=gainers&limit=5 - Get gainers/losers
+    GET /api/market/movers?type=gainers&limit=5 - Get gainers/losers/active/volatile
     """
     def get(self, request):
-        mover_type = request.query_params.get('type', 'gainers')
+        mover_type = request.query_params.get('type', 'gainers').lower()
         limit = request.query_params.get('limit', 5)
         
         try:
             limit = int(limit)
         except ValueError:
             limit = 5
+        if mover_type not in MOVERS:
+            return Response({'error': f"Invalid type. Use one of {', '.join(MOVERS)}"}, status=400)
         
-        gainers = [
-            {'symbol': 'TSLA', 'price': 250.5, 'change': 5.2, 'changePercent': 2.1},
-            {'symbol': 'META', 'price': 520.0, 'change': 12.5, 'changePercent': 2.4},
-            {'symbol': 'NFLX', 'price': 450.3, 'change': 8.2, 'changePercent': 1.8},
-        ]
-        
-        losers = [
-            {'symbol': 'AMZN', 'price': 180.2, 'change': -2.1, 'changePercent': -1.2},
-            {'symbol': 'GOOGL', 'price': 145.8, 'change': -1.5, 'changePercent': -1.0},
-        ]
-        
-        movers = gainers if mover_type.lower() == 'gainers' else losers
-        return Response({'type': mover_type, 'movers': movers[:limit]})
+        movers = market_snapshot().movers(mover_type, min(max(limit, 0), MAX_RESULTS))
+        return Response({'type': mover_type, 'movers': movers})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MarketScreenerView(APIView):
+    """
+    Screen every stock's latest bar
+    GET /api/market/screener/?min_change=1&min_volume=1000000&max_volatility=40&sort=volume&order=desc&limit=25
+        - Filters: min_/max_ change (%), volume, volatility (annualised %, 20 bars), price
+    """
+    def get(self, request):
+        try:
+            filters = {
+                name: float(request.query_params[name]) for name in SCREEN_FILTERS if name in request.query_params
+            }
+            limit = int(request.query_params.get('limit', 25))
+        except ValueError:
+            return Response({'error': 'Filters must be numbers and limit an integer'}, status=400)
+        sort = request.query_params.get('sort', 'change')
+        if sort not in SORT_COLUMNS:
+            return Response({'error': f"Invalid sort. Use one of {', '.join(SORT_COLUMNS)}"}, status=400)
+        order = request.query_params.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            return Response({'error': "Invalid order. Use 'asc' or 'desc'"}, status=400)
+
+        stocks, matched = market_snapshot().screen(
+            filters, sort=sort, largest=order == 'desc', limit=min(max(limit, 0), MAX_RESULTS),
+        )
+        return Response({'matched': matched, 'stocks': stocks})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MarketQuotesView(APIView):
+    """
+    Latest quotes
+    GET /api/market/quotes/?symbols=AAPL,TSLA - Quotes in request order; unknown symbols listed in 'missing'
+    """
+    def get(self, request):
+        symbols = [s.strip().upper() for s in request.query_params.get('symbols', '').split(',') if s.strip()]
+        if not symbols:
+            return Response({'error': 'symbols parameter required'}, status=400)
+        if len(symbols) > MAX_RESULTS:
+            return Response({'error': f'At most {MAX_RESULTS} symbols per request'}, status=400)
+        quotes, missing = market_snapshot().quotes(symbols)
+        return Response({'quotes': quotes, 'missing': missing})
 
     
 
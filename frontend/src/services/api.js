@@ -170,27 +170,87 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
 console.log("API_BASE_URL at runtime:", API_BASE_URL);
 
+const COMPACT_TYPE = 'application/vnd.devstock.compact+json';
+const PACKED_TYPE = 'application/vnd.devstock.packed';
+const DAY_MS = 86400000;
+
+/**
+ * Reverse the server's compact series encoding (core/renderers.py)
+ * @param {*} value - Decoded JSON value
+ * @param {ArrayBuffer} body - Typed-array section of a packed response
+ * @returns {*} Value with plain arrays and records restored
+ */
+function decodeSeries(value, body) {
+  if (Array.isArray(value)) return value.map((item) => decodeSeries(item, body));
+  if (value === null || typeof value !== 'object') return value;
+
+  if ('$f32' in value) {
+    const [offset, length] = value.$f32;
+    return Array.from(new Float32Array(body, offset, length));
+  }
+  if ('$i32' in value) {
+    const [offset, length] = value.$i32;
+    return Array.from(new Int32Array(body, offset, length));
+  }
+  if ('$dates' in value) {
+    let day = Date.parse(value.$dates) / DAY_MS;
+    return decodeSeries(value.deltas, body).map((delta) => {
+      day += delta;
+      return new Date(day * DAY_MS).toISOString().slice(0, 10);
+    });
+  }
+  if ('$columns' in value) {
+    const columns = Object.entries(value.$columns).map(([key, column]) => [key, decodeSeries(column, body)]);
+    return Array.from({ length: value.length }, (_, i) =>
+      Object.fromEntries(columns.map(([key, column]) => [key, column[i]])));
+  }
+  return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, decodeSeries(item, body)]));
+}
+
+/**
+ * Parse a response body according to its Content-Type
+ * @param {Response} response - Fetch response
+ * @returns {Promise} Response data
+ */
+async function decodeResponse(response) {
+  const contentType = response.headers.get('Content-Type') || '';
+  if (contentType.startsWith(PACKED_TYPE)) {
+    // 'DSP1', uint32 header length, JSON header, then 4-byte aligned typed arrays
+    const buffer = await response.arrayBuffer();
+    const headerLength = new DataView(buffer).getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    return decodeSeries(header, buffer.slice(8 + headerLength));
+  }
+  if (contentType.startsWith(COMPACT_TYPE)) {
+    return decodeSeries(await response.json());
+  }
+  return response.json();
+}
+
 /**
  * Generic fetch wrapper with error handling
  * @param {string} endpoint - API endpoint
- * @param {Object} options - Fetch options
+ * @param {Object} options - Fetch options; `format: 'packed' | 'compact'` asks for a compact series encoding
  * @returns {Promise} Response data
  */
 async function fetchApi(endpoint, options = {}) {
   const url = `${API_BASE_URL}${endpoint}`;
+  const { format, ...fetchOptions } = options;
   
   const defaultOptions = {
     headers: {
       'Content-Type': 'application/json',
+      ...(format === 'packed' && { Accept: PACKED_TYPE }),
+      ...(format === 'compact' && { Accept: COMPACT_TYPE }),
     },
   };
 
   const mergedOptions = {
     ...defaultOptions,
-    ...options,
+    ...fetchOptions,
     headers: {
       ...defaultOptions.headers,
-      ...options.headers,
+      ...fetchOptions.headers,
     },
   };
 
@@ -198,11 +258,11 @@ async function fetchApi(endpoint, options = {}) {
     const response = await fetch(url, mergedOptions);
     
     if (!response.ok) {
-      const error = await response.json().catch(() => ({}));
-      throw new Error(error.message || `HTTP error! status: ${response.status}`);
+      const error = await decodeResponse(response).catch(() => ({}));
+      throw new Error(error.message || error.error || `HTTP error! status: ${response.status}`);
     }
     
-    return await response.json();
+    return await decodeResponse(response);
   } catch (error) {
     console.error(`API Error (${endpoint}):`, error);
     throw error;
@@ -227,7 +287,7 @@ export const stockApi = {
    * @param {string} symbol - Stock ticker symbol
    * @returns {Promise<Object>} Stock data
    */
-  getBySymbol: (symbol) => fetchApi(`/stocks/${symbol}/`),
+  getBySymbol: (symbol) => fetchApi(`/stocks/${symbol}/`, { format: 'packed' }),
 
   /**
    * Get stock price history
@@ -235,7 +295,8 @@ export const stockApi = {
    * @param {string} range - Time range (1d, 1w, 1m, 3m, 1y)
    * @returns {Promise<Array>} Price history data
    */
-  getHistory: (symbol, range = '1m') => fetchApi(`/stocks/${symbol}/history/?range=${range}`),
+  getHistory: (symbol, range = '1m') =>
+    fetchApi(`/stocks/${symbol}/history/?range=${range}`, { format: 'packed' }),
 
   /**
    * Search stocks